@@ -2,6 +2,9 @@
 
 This module centralizes all configuration values and constants used throughout the project.
 """
+import platform
+from pathlib import Path
+
 
 class AudioConfig:
     """Audio processing configuration."""
@@ -10,8 +13,8 @@ class AudioConfig:
     DEFAULT_CHANNELS = 1
     AUDIO_CLIP_MIN = -1
     AUDIO_CLIP_MAX = 1
-    INITIAL_PLAYBACK_DELAY = 3  # seconds
-    LOOP_PLAYBACK_DELAY = 1  # seconds
+    PLAYBACK_TIMEOUT_MARGIN = 2.0  # seconds allowed beyond the buffered audio for playback to end
+    PLAYBACK_CHECK_INTERVAL = 0.5  # seconds between output stream health checks
 
 
 class TTSConfig:
@@ -24,17 +27,52 @@ class TTSConfig:
     DEFAULT_FINAL_PADDING = 2
     DEFAULT_PADDING_BONUS = 0
     RANDOM_SEED = 299792458
-    DEFAULT_MODEL_DTYPE = "bfloat16"  # Use string to avoid importing mx here
+    DEFAULT_HF_REPO = "kyutai/tts-1.6b-en_fr"  # moshi_mlx's DEFAULT_DSM_TTS_REPO
+    DEFAULT_MODEL_DTYPE = "float16"  # Use string to avoid importing mx here
+    FALLBACK_MODEL_DTYPE = "bfloat16"  # Used before FLOAT16_MIN_MACOS_VERSION
+    FLOAT16_MIN_MACOS_VERSION = 14  # macOS Sonoma
     DEFAULT_MODEL_NAME = "model.safetensors"
     CONFIG_FILE_NAME = "config.json"
     ALLOWED_QUANTIZATION_LEVELS = [4, 8]
+    DEFAULT_QUANTIZATION = 4  # bits; None disables quantization
+    QUANTIZATION_GROUP_SIZE = 64
+    MIMI_QUANTIZATION_BITS = 8  # Mimi decoder transformer; 8 bits keeps audio quality
+    WARMUP_TEXT = "warmup."
+    MAX_CHUNK_TOKENS = 512  # text tokens per generate() call
+    AUDIO_CACHE_DIR = Path.home() / ".cache" / "toolchest" / "audio"
+    AUDIO_CACHE_MAX_BYTES = 1 << 30  # least recently used WAVs are evicted past 1 GiB
+
+
+
+def default_model_dtype() -> str:
+    """Pick the model dtype name for this machine.
+    
+    float16 has native Metal kernels and decodes faster than bfloat16 on
+    Apple Silicon; on macOS releases before Sonoma the gap disappears, so
+    bfloat16 is kept there. Lives here rather than in tts_engine so the
+    audio cache can key on it without importing MLX.
+    """
+    release = platform.mac_ver()[0]
+    if release:
+        try:
+            major = int(release.split(".")[0])
+        except ValueError:
+            return TTSConfig.DEFAULT_MODEL_DTYPE
+        if major < TTSConfig.FLOAT16_MIN_MACOS_VERSION:
+            return TTSConfig.FALLBACK_MODEL_DTYPE
+    return TTSConfig.DEFAULT_MODEL_DTYPE
 
 
 class URLExtractorConfig:
     """URL extraction configuration."""
     USER_AGENT = "Mozilla/5.0 (compatible; TTS-TextExtractor/1.0)"
     REQUEST_TIMEOUT = 10  # seconds
-    DEFAULT_PARSER = "lxml"
+    CONNECT_TIMEOUT = 3.05  # seconds; fail fast on unreachable hosts
+    CONNECT_RETRIES = 2  # retries for failed connection attempts
+    MAX_PAGE_BYTES = 4 * 1024 * 1024  # longer pages are truncated while downloading
+    RESPONSE_CACHE_PATH = Path.home() / ".cache" / "toolchest" / "response_cache.sqlite"
+    RESPONSE_CACHE_MAX_ENTRIES = 200
+    RESPONSE_CACHE_TTL = 3600  # upper bound on seconds a cached page is used without revalidating
     TEXT_ELEMENTS = ["p", "h1", "h2", "h3", "h4", "h5", "h6", "li"]
     REMOVE_ELEMENTS = ["script", "style"]
     VERBOSE_PREVIEW_LENGTH = 200  # characters
@@ -52,5 +90,12 @@ class OllamaConfig:
     
     Filename:"""
     MAX_FILENAME_LENGTH = 50
+    FILENAME_KEYWORDS = 3  # words in a keyword-based (non-LLM) filename
+    KEYWORD_SOURCE_LENGTH = 500  # characters of text scanned for keywords
     FILENAME_GENERATION_TIMEOUT = 10  # seconds
-    MAX_TEXT_LENGTH_FOR_SUMMARY = 1000  # characters to send to Ollama
\ No newline at end of file
+    KEEP_ALIVE = "30m"  # keep the model loaded in Ollama between requests
+    FILENAME_MAX_TOKENS = 16  # tokens generated for a filename (num_predict)
+    FILENAME_CONTEXT_LENGTH = 512  # Ollama context window (num_ctx); fits the truncated prompt
+    MAX_TEXT_LENGTH_FOR_SUMMARY = 1000  # characters to send to Ollama
+    FILENAME_CACHE_PATH = Path.home() / ".cache" / "toolchest" / "filename_cache.sqlite"
+    FILENAME_CACHE_MAX_ENTRIES = 1000
\ No newline at end of file
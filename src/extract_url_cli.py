@@ -10,14 +10,13 @@ Usage:
 import argparse
 import sys
 try:
-    from .url_extractor import URLExtractor
     from .logger import Logger
 except ImportError:
-    from url_extractor import URLExtractor
     from logger import Logger
 
 
-def main():
+def _build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser without importing the extraction stack."""
     parser = argparse.ArgumentParser(
         description="Extract human-readable text from URLs for TTS processing"
     )
@@ -32,8 +31,18 @@ def main():
         action="store_true",
         help="Enable verbose output to stderr",
     )
+    return parser
+
+
+def main():
+    args = _build_parser().parse_args()
     
-    args = parser.parse_args()
+    # Import httpx/lxml only once arguments are valid, so
+    # --help and usage errors return without loading them
+    try:
+        from .url_extractor import URLExtractor
+    except ImportError:
+        from url_extractor import URLExtractor
     
     # Create logger
     logger = Logger("extract_url_cli", level="debug" if args.verbose else "info")
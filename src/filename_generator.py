@@ -1,9 +1,16 @@
 """Module for generating descriptive filenames using Ollama."""
+import functools
+import hashlib
 import re
-import ollama
-from datetime import datetime
-from urllib.parse import urlparse
-from typing import Optional
+import sqlite3
+import time
+from collections import Counter
+from pathlib import Path
+from urllib.parse import urlsplit
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import ollama
 
 try:
     from .config import OllamaConfig
@@ -13,17 +20,179 @@ except ImportError:
     from logger import Logger
 
 
+class _SanitizeTable(dict):
+    """Translation table mapping any character outside the table to '_'."""
+    
+    def __missing__(self, key: int) -> str:
+        return '_'
+
+
+# Built once at import: lowercases ASCII letters, keeps digits and maps
+# everything else to '_' so sanitize_filename needs a single translate pass
+_SANITIZE_TABLE = _SanitizeTable(
+    (code, chr(code).lower() if chr(code).isalnum() else '_')
+    for code in range(128)
+)
+_UNDERSCORE_RUN_RE = re.compile(r'_{2,}')
+
+_WORD_RE = re.compile(r'[a-z0-9]+')
+_STOPWORDS = frozenset("""
+a about above after again against all also am an and any are as at be because
+been before being below between both but by can could did do does doing down
+during each few for from further had has have having he her here hers herself
+him himself his how i if in into is it its itself just me more most my myself
+no nor not now of off on once only or other our ours ourselves out over own
+said same she should so some such than that the their theirs them themselves
+then there these they this those through to too under until up very was we
+were what when where which while who whom why will with would you your yours
+yourself yourselves new one two may many much like get got via
+""".split())
+
+# Prompt template split once around its single {text} placeholder
+_PROMPT_PRE, _PROMPT_POST = OllamaConfig.FILENAME_PROMPT_TEMPLATE.split("{text}")
+
+
+class FilenameCache:
+    """On-disk LRU cache mapping prompt hashes to generated filename stems."""
+    
+    def __init__(self, path: Path, max_entries: int = OllamaConfig.FILENAME_CACHE_MAX_ENTRIES):
+        """Initialize the cache.
+        
+        Args:
+            path: Location of the SQLite database file
+            max_entries: Number of entries kept before the least recently used are evicted
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._conn = None
+    
+    @staticmethod
+    def make_key(model: str, prompt: str) -> str:
+        """Build the cache key for a model and prompt pair."""
+        return hashlib.blake2b(f"{model}\0{prompt}".encode(), digest_size=16).hexdigest()
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.path)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache "
+                "(key TEXT PRIMARY KEY, stem TEXT NOT NULL, accessed REAL NOT NULL)"
+            )
+        return self._conn
+    
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached stem for key, or None on a miss."""
+        conn = self._connect()
+        row = conn.execute("SELECT stem FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        with conn:
+            conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (time.time(), key))
+        return row[0]
+    
+    def set(self, key: str, stem: str):
+        """Store stem under key, evicting the least recently used entries."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (key, stem, accessed) VALUES (?, ?, ?)",
+                (key, stem, time.time()),
+            )
+            conn.execute(
+                "DELETE FROM cache WHERE key NOT IN "
+                "(SELECT key FROM cache ORDER BY accessed DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+    
+    def close(self):
+        """Close the database connection if it was opened."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def _sanitize(filename: str) -> str:
+    """Sanitize a filename; see FilenameGenerator.sanitize_filename."""
+    # Lowercase and replace special characters with underscores in one pass
+    filename = filename.translate(_SANITIZE_TABLE)
+    
+    # Collapse consecutive underscores and trim leading/trailing ones
+    filename = _UNDERSCORE_RUN_RE.sub('_', filename).strip('_')
+    
+    # Handle empty result
+    if not filename:
+        filename = "unnamed"
+    
+    # Limit length
+    if len(filename) > OllamaConfig.MAX_FILENAME_LENGTH:
+        filename = filename[:OllamaConfig.MAX_FILENAME_LENGTH]
+    
+    return filename
+
+
+@functools.lru_cache(maxsize=1024)
+def _url_to_stem(url: str) -> str:
+    """Build the sanitized, unstamped filename stem for a URL."""
+    parsed = urlsplit(url)
+    
+    # Extract domain and the last meaningful (non-numeric) path segment
+    domain = parsed.netloc.replace('.', '_')
+    path = ""
+    for part in reversed(parsed.path.split('/')):
+        if part and not part.isdigit():
+            path = part
+            break
+    
+    # Combine domain and path
+    if path:
+        base_name = f"{domain}_{path}"
+    else:
+        base_name = domain
+    
+    return _sanitize(base_name)
+
+
 class FilenameGenerator:
     """Generate descriptive filenames using Ollama LLM."""
     
-    def __init__(self, model: Optional[str] = None):
+    def __init__(self, model: Optional[str] = None, cache_path: Optional[Path] = None):
         """Initialize the filename generator.
         
         Args:
             model: Ollama model to use (defaults to OllamaConfig.DEFAULT_MODEL)
+            cache_path: Filename cache location (defaults to OllamaConfig.FILENAME_CACHE_PATH)
         """
         self.model = model or OllamaConfig.DEFAULT_MODEL
         self.logger = Logger("FilenameGenerator")
+        # Created on first use; one client per generator keeps the HTTP
+        # connection to Ollama alive across calls
+        self._client: Optional["ollama.Client"] = None
+        self.cache = FilenameCache(cache_path or OllamaConfig.FILENAME_CACHE_PATH)
+    
+    def _get_client(self) -> "ollama.Client":
+        """Return the Ollama client, importing ollama on first use."""
+        if self._client is None:
+            import ollama
+            self._client = ollama.Client(timeout=OllamaConfig.FILENAME_GENERATION_TIMEOUT)
+        return self._client
+    
+    def close(self):
+        """Close the HTTP connection to Ollama and the filename cache."""
+        if self._client is not None:
+            # Client.close() only exists in newer ollama releases; older
+            # clients release their connection pool when collected
+            close = getattr(self._client, "close", None)
+            if close is not None:
+                close()
+            self._client = None
+        self.cache.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
     
     def sanitize_filename(self, filename: str) -> str:
         """Sanitize a filename for filesystem compatibility.
@@ -34,27 +203,7 @@ class FilenameGenerator:
         Returns:
             Sanitized filename safe for filesystem use
         """
-        # Convert to lowercase
-        filename = filename.lower()
-        
-        # Replace special characters and spaces with underscores
-        filename = re.sub(r'[^a-z0-9]+', '_', filename)
-        
-        # Remove leading/trailing underscores
-        filename = filename.strip('_')
-        
-        # Remove consecutive underscores
-        filename = re.sub(r'_+', '_', filename)
-        
-        # Handle empty result
-        if not filename:
-            filename = "unnamed"
-        
-        # Limit length
-        if len(filename) > OllamaConfig.MAX_FILENAME_LENGTH:
-            filename = filename[:OllamaConfig.MAX_FILENAME_LENGTH]
-        
-        return filename
+        return _sanitize(filename)
     
     def add_timestamp(self, filename: str) -> str:
         """Add timestamp to filename.
@@ -65,8 +214,24 @@ class FilenameGenerator:
         Returns:
             Filename with timestamp appended
         """
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        return f"{filename}_{timestamp}"
+        t = time.localtime()
+        return (
+            f"{filename}_{t.tm_year:04d}{t.tm_mon:02d}{t.tm_mday:02d}"
+            f"_{t.tm_hour:02d}{t.tm_min:02d}{t.tm_sec:02d}"
+        )
+    
+    def _cache_get(self, key: str) -> Optional[str]:
+        try:
+            return self.cache.get(key)
+        except (sqlite3.Error, OSError) as e:
+            self.logger.warning(f"Filename cache unavailable: {e}")
+            return None
+    
+    def _cache_set(self, key: str, stem: str):
+        try:
+            self.cache.set(key, stem)
+        except (sqlite3.Error, OSError) as e:
+            self.logger.warning(f"Failed to update filename cache: {e}")
     
     def generate_from_content(
         self, 
@@ -89,36 +254,51 @@ class FilenameGenerator:
             if len(text) > OllamaConfig.MAX_TEXT_LENGTH_FOR_SUMMARY:
                 text = text[:OllamaConfig.MAX_TEXT_LENGTH_FOR_SUMMARY] + "..."
             
-            # Build prompt
-            prompt = OllamaConfig.FILENAME_PROMPT_TEMPLATE
-            
             # Include title if provided
             if title:
                 prompt_text = f"Title: {title}\n\n{text}"
             else:
                 prompt_text = text
             
-            prompt = prompt.format(text=prompt_text)
+            # Build prompt
+            prompt = _PROMPT_PRE + prompt_text + _PROMPT_POST
             
-            # Call Ollama
-            self.logger.info(f"Generating filename using Ollama model: {self.model}")
-            response = ollama.chat(
-                model=self.model,
-                messages=[{
-                    'role': 'user',
-                    'content': prompt
-                }],
-                options={
-                    'timeout': OllamaConfig.FILENAME_GENERATION_TIMEOUT
-                }
-            )
+            # Reuse a previously generated name for the same prompt
+            cache_key = FilenameCache.make_key(self.model, prompt)
+            filename = self._cache_get(cache_key)
             
-            # Extract filename from response
-            generated_name = response['message']['content'].strip()
-            self.logger.info(f"Ollama generated filename: {generated_name}")
+            if filename is None:
+                # Call Ollama
+                self.logger.info(f"Generating filename using Ollama model: {self.model}")
+                response = self._get_client().chat(
+                    model=self.model,
+                    messages=[{
+                        'role': 'user',
+                        'content': prompt
+                    }],
+                    options={
+                        'timeout': OllamaConfig.FILENAME_GENERATION_TIMEOUT,
+                        # A filename is a handful of tokens on one line;
+                        # cap the work and decode greedily
+                        'num_predict': OllamaConfig.FILENAME_MAX_TOKENS,
+                        'num_ctx': OllamaConfig.FILENAME_CONTEXT_LENGTH,
+                        'temperature': 0,
+                        'top_k': 1,
+                        'stop': ['\n']
+                    },
+                    keep_alive=OllamaConfig.KEEP_ALIVE
+                )
+                
+                # Extract filename from response
+                generated_name = response['message']['content'].strip()
+                self.logger.info(f"Ollama generated filename: {generated_name}")
+                
+                filename = self.sanitize_filename(generated_name)
+                self._cache_set(cache_key, filename)
+            else:
+                self.logger.info(f"Using cached filename: {filename}")
             
-            # Sanitize and add timestamp
-            filename = self.sanitize_filename(generated_name)
+            # Add timestamp so repeated conversions stay unique
             filename = self.add_timestamp(filename)
             
             return f"{filename}.wav"
@@ -135,6 +315,41 @@ class FilenameGenerator:
                 filename = self.add_timestamp("audio_file")
                 return f"{filename}.wav"
     
+    def generate_from_keywords(
+        self,
+        text: str,
+        title: Optional[str] = None,
+        url: Optional[str] = None
+    ) -> str:
+        """Generate a filename from the most frequent keywords, without an LLM.
+        
+        Uses the title when given, otherwise the start of the text. Words are
+        ranked by frequency and kept in the order they first appear.
+        
+        Args:
+            text: The text content
+            title: Optional page title
+            url: Optional source URL (used as fallback)
+            
+        Returns:
+            Generated filename with .wav extension
+        """
+        source = title or text[:OllamaConfig.KEYWORD_SOURCE_LENGTH]
+        words = [
+            word for word in _WORD_RE.findall(source.lower())
+            if len(word) > 2 and word not in _STOPWORDS
+        ]
+        if not words:
+            if url:
+                return self.generate_from_url(url)
+            return f"{self.add_timestamp('audio_file')}.wav"
+        
+        # Counter keeps first-seen order, so ties favour earlier words
+        top = {word for word, _ in Counter(words).most_common(OllamaConfig.FILENAME_KEYWORDS)}
+        keywords = list(dict.fromkeys(word for word in words if word in top))
+        filename = self.add_timestamp(_sanitize('_'.join(keywords)))
+        return f"{filename}.wav"
+    
     def generate_from_url(self, url: str) -> str:
         """Generate filename from URL.
         
@@ -145,32 +360,8 @@ class FilenameGenerator:
             Generated filename with .wav extension
         """
         try:
-            parsed = urlparse(url)
-            
-            # Extract domain and path
-            domain = parsed.netloc.replace('.', '_')
-            path = parsed.path.strip('/')
-            
-            if path:
-                # Get the last part of the path
-                path_parts = path.split('/')
-                # Take the last meaningful part
-                relevant_parts = [p for p in path_parts if p and not p.isdigit()]
-                if relevant_parts:
-                    path = relevant_parts[-1]
-                else:
-                    path = ""
-            
-            # Combine domain and path
-            if path:
-                base_name = f"{domain}_{path}"
-            else:
-                base_name = domain
-            
-            # Sanitize and add timestamp
-            filename = self.sanitize_filename(base_name)
-            filename = self.add_timestamp(filename)
-            
+            # Stems are cached per URL; only the timestamp changes between calls
+            filename = self.add_timestamp(_url_to_stem(url))
             return f"{filename}.wav"
             
         except Exception:
@@ -1,16 +1,21 @@
 import sys
-from datetime import datetime
+import time
 from typing import Optional, TextIO
 
 
 class Logger:
     """Centralized logging functionality for the Toolchest application."""
     
+    DEBUG = 0
+    INFO = 1
+    WARNING = 2
+    ERROR = 3
+    
     LEVELS = {
-        "debug": 0,
-        "info": 1,
-        "warning": 2,
-        "error": 3,
+        "debug": DEBUG,
+        "info": INFO,
+        "warning": WARNING,
+        "error": ERROR,
     }
     
     def __init__(self, name: str, level: str = "info", output: Optional[TextIO] = None):
@@ -23,36 +28,82 @@ class Logger:
             output: The output stream (defaults to stderr)
         """
         self.name = name
-        self.level = self.LEVELS.get(level.lower(), 1)
+        self.level = self.LEVELS.get(level.lower(), self.INFO)
         self.output = output or sys.stderr
+        # Timestamp string cached for the current wall-clock second
+        self._last_sec = -1
+        self._last_ts_str = ""
+        
+    @property
+    def level(self) -> int:
+        """The minimum level output, as an integer (e.g. ``Logger.INFO``)."""
+        return self._level
+        
+    @level.setter
+    def level(self, value: int):
+        self._level = value
+        # Per-name enabled flags so string-level checks are a single lookup;
+        # rebuilt here so they always agree with the integer level
+        self._enabled = {name: level >= value for name, level in self.LEVELS.items()}
         
-    def _make_log(self, level: str, msg: str) -> str:
-        """Format a log message with timestamp, level, and module name."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        return f"[{timestamp}] [{level.upper()}] [{self.name}] {msg}"
+    def _make_log(self, level_name: str, msg: str) -> str:
+        """Format a log message with timestamp, uppercase level name, and module name."""
+        sec = int(time.time())
+        if sec != self._last_sec:
+            self._last_sec = sec
+            self._last_ts_str = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(sec))
+        return f"[{self._last_ts_str}] [{level_name}] [{self.name}] {msg}"
         
     def _should_log(self, level: str) -> bool:
         """Check if the given level should be logged based on current settings."""
-        return self.LEVELS.get(level.lower(), 0) >= self.level
+        enabled = self._enabled.get(level)
+        if enabled is None:
+            enabled = self.LEVELS.get(level.lower(), self.DEBUG) >= self._level
+        return enabled
+        
+    def _emit(self, level_name: str, msg: str, args: tuple):
+        """Format and write a message that has passed the level check."""
+        if args:
+            msg = msg % args
+        self.output.write(self._make_log(level_name, msg) + "\n")
+        self.output.flush()
+        
+    def _log(self, level: int, level_name: str, msg: str, args: tuple):
+        """Output a message given an integer level and its uppercase name."""
+        if level >= self._level:
+            self._emit(level_name, msg, args)
         
-    def log(self, level: str, msg: str):
-        """Log a message at the specified level."""
+    def isEnabledFor(self, level: int | str) -> bool:
+        """Return True if a message at the given level would be output.
+        
+        Accepts an integer level (e.g. ``Logger.DEBUG``) or a level name.
+        Lets call sites skip building expensive messages entirely.
+        """
+        if isinstance(level, str):
+            return self._should_log(level)
+        return level >= self._level
+        
+    def log(self, level: str, msg: str, *args):
+        """Log a message at the specified level.
+        
+        Like the standard logging module, ``msg % args`` is only formatted
+        when the message is actually output.
+        """
         if self._should_log(level):
-            self.output.write(self._make_log(level, msg) + "\n")
-            self.output.flush()
+            self._emit(level.upper(), msg, args)
             
-    def debug(self, msg: str):
+    def debug(self, msg: str, *args):
         """Log a debug message."""
-        self.log("debug", msg)
+        self._log(self.DEBUG, "DEBUG", msg, args)
         
-    def info(self, msg: str):
+    def info(self, msg: str, *args):
         """Log an info message."""
-        self.log("info", msg)
+        self._log(self.INFO, "INFO", msg, args)
         
-    def warning(self, msg: str):
+    def warning(self, msg: str, *args):
         """Log a warning message."""
-        self.log("warning", msg)
+        self._log(self.WARNING, "WARNING", msg, args)
         
-    def error(self, msg: str):
+    def error(self, msg: str, *args):
         """Log an error message."""
-        self.log("error", msg)
\ No newline at end of file
+        self._log(self.ERROR, "ERROR", msg, args)
\ No newline at end of file
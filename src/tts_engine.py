@@ -1,7 +1,10 @@
 import json
-import queue
+import mmap
+import os
+import re
 import time
-from typing import Callable, List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterator, List, Optional
 
 import mlx.core as mx
 import mlx.nn as nn
@@ -9,64 +12,157 @@ import numpy as np
 import sentencepiece
 from moshi_mlx import models
 from moshi_mlx.models.tts import (
-    DEFAULT_DSM_TTS_REPO,
     DEFAULT_DSM_TTS_VOICE_REPO,
     TTSModel,
+    TTSResult,
 )
 from moshi_mlx.utils.loaders import hf_get
 
 try:
-    from .config import AudioConfig, TTSConfig
+    from .config import AudioConfig, TTSConfig, default_model_dtype
     from .logger import Logger
 except ImportError:
-    from config import AudioConfig, TTSConfig
+    from config import AudioConfig, TTSConfig, default_model_dtype
     from logger import Logger
 
 
+# Sentence boundary: whitespace after terminal punctuation, kept so chunks
+# can be rejoined with their original spacing (including paragraph breaks)
+_SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?])(\s+)')
+
+
+@mx.compile
+def _finalize_pcm(pcm: mx.array) -> mx.array:
+    """Select the mono channel, clip and cast a decoded frame in one fused graph."""
+    clipped = mx.clip(pcm[0, 0], AudioConfig.AUDIO_CLIP_MIN, AudioConfig.AUDIO_CLIP_MAX)
+    return clipped.astype(mx.float32)
+
+
+def _prefetch_file(path) -> None:
+    """Ask the kernel to start reading a file into the page cache.
+    
+    Best effort: failures are ignored since the file is read normally later.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except (OSError, TypeError):
+        return
+    try:
+        if hasattr(os, "posix_fadvise"):
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_WILLNEED)
+        elif hasattr(mmap, "MADV_WILLNEED"):
+            size = os.fstat(fd).st_size
+            if size:
+                with mmap.mmap(fd, size, access=mmap.ACCESS_READ) as mapped:
+                    mapped.madvise(mmap.MADV_WILLNEED)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def _fetch_and_prefetch(name: str, repo: str):
+    """Download a checkpoint file and start warming the page cache for it."""
+    path = hf_get(name, repo)
+    _prefetch_file(path)
+    return path
+
+
+def fetch_checkpoints(hf_repo: str = TTSConfig.DEFAULT_HF_REPO):
+    """Load the model config and download the checkpoint files it names.
+    
+    The weights and tokenizer are fetched concurrently and prefetched into
+    the page cache so loading doesn't wait on sequential I/O. Safe to call
+    ahead of initialize() to overlap this with other work; files already
+    downloaded are served from the Hugging Face cache.
+    
+    Returns:
+        Tuple of (raw_config, mimi_weights, moshi_weights, tokenizer)
+    """
+    config_path = hf_get(TTSConfig.CONFIG_FILE_NAME, hf_repo)
+    with open(config_path, "r") as fobj:
+        raw_config = json.load(fobj)
+    
+    moshi_name = raw_config.get("moshi_name", TTSConfig.DEFAULT_MODEL_NAME)
+    names = [raw_config["mimi_name"], moshi_name, raw_config["tokenizer_name"]]
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        mimi_weights, moshi_weights, tokenizer = pool.map(
+            lambda name: _fetch_and_prefetch(name, hf_repo), names
+        )
+    return raw_config, mimi_weights, moshi_weights, tokenizer
+
+
+def _merge_results(results: List[TTSResult]) -> TTSResult:
+    """Join per-chunk generation results into one, as a single generate() would.
+    
+    Step indices (end steps, consumption times, transcript steps) are shifted
+    by the frames generated before each chunk. A batch item's end step is
+    None if any chunk ran out of budget before finishing its text.
+    """
+    batch_size = len(results[0].end_steps) if results else 1
+    frames, logged_text_tokens = [], []
+    end_steps = [0] * batch_size
+    consumption_times = [[] for _ in range(batch_size)]
+    transcripts = [[] for _ in range(batch_size)]
+    offset = 0
+    for result in results:
+        frames.extend(result.frames)
+        logged_text_tokens.extend(result.logged_text_tokens)
+        for b in range(batch_size):
+            end = result.end_steps[b]
+            end_steps[b] = None if end is None or end_steps[b] is None else offset + end
+            consumption_times[b].extend(offset + step for step in result.all_consumption_times[b])
+            transcripts[b].extend((word, offset + step) for word, step in result.all_transcripts[b])
+        offset += len(result.frames)
+    return TTSResult(
+        frames=frames,
+        logged_text_tokens=logged_text_tokens,
+        end_steps=end_steps,
+        all_consumption_times=consumption_times,
+        all_transcripts=transcripts,
+    )
+
+
 class TTSEngine:
     def __init__(
         self,
-        hf_repo: str = DEFAULT_DSM_TTS_REPO,
+        hf_repo: str = TTSConfig.DEFAULT_HF_REPO,
         voice_repo: str = DEFAULT_DSM_TTS_VOICE_REPO,
-        quantize: Optional[int] = None,
+        quantize: Optional[int] = TTSConfig.DEFAULT_QUANTIZATION,
+        dtype: Optional[str] = None,
+        warmup: bool = True,
     ):
         self.hf_repo = hf_repo
         self.voice_repo = voice_repo
         self.quantize = quantize
+        self.dtype = dtype or default_model_dtype()
+        self.warmup = warmup
         self.model = None
         self.audio_tokenizer = None
         self.text_tokenizer = None
         self.tts_model = None
         self.mimi = None
-        self.wav_frames = queue.Queue()
+        # Clipped PCM frames still on the device; synced in get_audio_frames()
+        self.wav_frames: List[mx.array] = []
+        # PCM samples decoded by the current generate_audio() call
+        self._total_samples = 0
         self.logger = Logger("TTSEngine")
         
     def initialize(self):
         mx.random.seed(TTSConfig.RANDOM_SEED)
         
         self.logger.info("retrieving checkpoints")
+        raw_config, mimi_weights, moshi_weights, tokenizer = fetch_checkpoints(self.hf_repo)
         
-        raw_config = hf_get(TTSConfig.CONFIG_FILE_NAME, self.hf_repo)
-        with open(hf_get(raw_config), "r") as fobj:
-            raw_config = json.load(fobj)
-        
-        mimi_weights = hf_get(raw_config["mimi_name"], self.hf_repo)
-        moshi_name = raw_config.get("moshi_name", TTSConfig.DEFAULT_MODEL_NAME)
-        moshi_weights = hf_get(moshi_name, self.hf_repo)
-        tokenizer = hf_get(raw_config["tokenizer_name"], self.hf_repo)
         lm_config = models.LmConfig.from_config_dict(raw_config)
         self.model = models.Lm(lm_config)
-        self.model.set_dtype(getattr(mx, TTSConfig.DEFAULT_MODEL_DTYPE))
+        self.model.set_dtype(getattr(mx, self.dtype))
         
         self.logger.info(f"loading model weights from {moshi_weights}")
         self.model.load_pytorch_weights(str(moshi_weights), lm_config, strict=True)
         
         if self.quantize is not None:
-            self.logger.info(f"quantizing model to {self.quantize} bits")
-            nn.quantize(self.model.depformer, bits=self.quantize)
-            for layer in self.model.transformer.layers:
-                nn.quantize(layer.self_attn, bits=self.quantize)
-                nn.quantize(layer.gating, bits=self.quantize)
+            self._quantize_model()
         
         self.logger.info(f"loading the text tokenizer from {tokenizer}")
         self.text_tokenizer = sentencepiece.SentencePieceProcessor(str(tokenizer))  # type: ignore
@@ -75,6 +171,14 @@ class TTSEngine:
         generated_codebooks = lm_config.generated_codebooks
         self.audio_tokenizer = models.mimi.Mimi(models.mimi_202407(generated_codebooks))
         self.audio_tokenizer.load_pytorch_weights(str(mimi_weights), strict=True)
+        self.audio_tokenizer.set_dtype(getattr(mx, self.dtype))
+        if self.quantize is not None:
+            self._quantize_audio_decoder()
+        
+        # MLX is lazy: materialize the (possibly quantized) weights now so the
+        # first generate() call doesn't pay for loading inside the timed loop
+        self.logger.info("materializing model weights")
+        mx.eval(self.model.parameters(), self.audio_tokenizer.parameters())
         
         cfg_coef_conditioning = None
         self.tts_model = TTSModel(
@@ -103,60 +207,237 @@ class TTSEngine:
         self.mimi = self.tts_model.mimi
         self.cfg_coef_conditioning = cfg_coef_conditioning
         
+        if self.warmup:
+            self._warmup()
+        
+    def _warmup(self):
+        """Run a short hidden generation so Metal kernels are compiled up front.
+        
+        The warmup frames are discarded undecoded. Afterwards the LM caches
+        and Mimi's state are reset and the RNG is re-seeded, so the first
+        real generation starts as it would have without a warmup.
+        """
+        self.logger.info("warming up the inference loop")
+        try:
+            self.tts_model.generate(
+                [self.tts_model.prepare_script([TTSConfig.WARMUP_TEXT])],
+                self._condition_attributes(TTSConfig.DEFAULT_VOICE),
+                cfg_is_no_prefix=self.cfg_is_no_prefix,
+                cfg_is_no_text=self.cfg_is_no_text,
+                on_frame=lambda frame: None,
+            )
+        except Exception as e:
+            self.logger.warning(f"warmup failed, continuing without it: {e}")
+        self._reset_streaming_state()
+        mx.random.seed(TTSConfig.RANDOM_SEED)
+        clear_cache = getattr(mx, "clear_cache", None) or mx.metal.clear_cache
+        clear_cache()
+        
+    def _quantize_model(self):
+        """Quantize the depformer and transformer layers, as moshi_mlx's run_tts does."""
+        self.logger.info(f"quantizing model to {self.quantize} bits")
+        group_size = TTSConfig.QUANTIZATION_GROUP_SIZE
+        nn.quantize(self.model.depformer, group_size=group_size, bits=self.quantize)
+        for layer in self.model.transformer.layers:
+            nn.quantize(layer.self_attn, group_size=group_size, bits=self.quantize)
+            nn.quantize(layer.gating, group_size=group_size, bits=self.quantize)
+        
+    def _quantize_audio_decoder(self):
+        """Quantize the Mimi decoder transformer used by decode_step.
+        
+        Only its linear layers can be quantized (the SEANet decoder is all
+        convolutions), and the encoder is left alone since it only runs
+        while preparing voices.
+        """
+        bits = TTSConfig.MIMI_QUANTIZATION_BITS
+        self.logger.info(f"quantizing the audio decoder to {bits} bits")
+        nn.quantize(
+            self.audio_tokenizer.decoder_transformer,
+            group_size=TTSConfig.QUANTIZATION_GROUP_SIZE,
+            bits=bits,
+        )
+        
     def _on_frame(self, frame):
         if (frame == -1).any():
             return
         _pcm = self.tts_model.mimi.decode_step(frame[:, :, None])
-        _pcm = np.array(mx.clip(_pcm[0, 0], AudioConfig.AUDIO_CLIP_MIN, AudioConfig.AUDIO_CLIP_MAX))
-        self.wav_frames.put_nowait(_pcm)
+        _pcm = _finalize_pcm(_pcm)
+        self._total_samples += _pcm.shape[-1]
+        # Schedule the work without blocking on a device->host copy per frame
+        mx.async_eval(_pcm)
+        self.wav_frames.append(_pcm)
+        
+    def _reset_streaming_state(self):
+        """Clear the LM KV caches and all of Mimi's streaming state.
+        
+        moshi_mlx 0.3 does this at the start of every generate(); earlier
+        releases, including the locked 0.2.10, reset nothing, so the caches
+        would carry over from the previous call.
+        """
+        for cache in self.tts_model.lm.transformer_cache:
+            cache.reset()
+        for cache in self.tts_model.lm.depformer_cache:
+            cache.reset()
+        mimi = self.tts_model.mimi
+        reset_all = getattr(mimi, "reset_all", None)
+        if reset_all is not None:
+            reset_all()
+        else:
+            # What Mimi.reset_all() does in moshi_mlx 0.3
+            mimi.reset_state()
+            mimi.upsample.reset_state()
+            mimi.downsample.reset_state()
+        
+    def _condition_attributes(self, voice: str):
+        """Build the voice condition attributes for generate()."""
+        if self.tts_model.multi_speaker:
+            voices = [self.tts_model.get_voice_path(voice)]
+        else:
+            voices = []
+        return [
+            self.tts_model.make_condition_attributes(voices, self.cfg_coef_conditioning)
+        ]
+        
+    def _chunk_text(self, text: str) -> List[str]:
+        """Split text into sentence groups of at most MAX_CHUNK_TOKENS tokens.
+        
+        Each group is generated separately so the LM's KV cache, and with it
+        the per-frame decode cost, stays bounded on long articles. A single
+        sentence longer than the limit is kept whole. Blank text yields no
+        chunks.
+        """
+        if not text.strip():
+            return []
+        parts = _SENTENCE_SPLIT_RE.split(text)
+        chunks = []
+        current = ""
+        current_tokens = 0
+        separator = ""
+        # Bound once; the loop runs per sentence of the article
+        encode = self.text_tokenizer.encode
+        max_tokens = TTSConfig.MAX_CHUNK_TOKENS
+        for i in range(0, len(parts), 2):
+            sentence = parts[i]
+            n_tokens = len(encode(sentence))
+            if current and current_tokens + n_tokens > max_tokens:
+                chunks.append(current)
+                current = sentence
+                current_tokens = n_tokens
+            else:
+                current = current + separator + sentence
+                current_tokens += n_tokens
+            separator = parts[i + 1] if i + 1 < len(parts) else ""
+        if current:
+            chunks.append(current)
+        return chunks
         
     def generate_audio(
         self,
         text: str,
         voice: str = TTSConfig.DEFAULT_VOICE,
         on_frame_callback: Optional[Callable] = None,
-    ):
+    ) -> TTSResult:
+        """Generate audio for text, one generate() call per sentence chunk.
+        
+        Each chunk starts from cleared LM caches and a fresh Mimi decoder, so
+        it is synthesized and decoded as its own utterance; its frames follow
+        the previous chunk's in wav_frames.
+        
+        Returns:
+            The chunk results merged into a single TTSResult
+        """
         if self.tts_model is None:
             raise RuntimeError("Engine not initialized. Call initialize() first.")
             
-        all_entries = [self.tts_model.prepare_script([text])]
-        if self.tts_model.multi_speaker:
-            voices = [self.tts_model.get_voice_path(voice)]
-        else:
-            voices = []
-        all_attributes = [
-            self.tts_model.make_condition_attributes(voices, self.cfg_coef_conditioning)
-        ]
+        chunks = self._chunk_text(text)
+        all_attributes = self._condition_attributes(voice)
         
-        self.wav_frames = queue.Queue()
+        self.wav_frames = []
+        self._total_samples = 0
         
         callback = on_frame_callback or self._on_frame
         
-        self.logger.info("starting the inference loop")
+        self.logger.info(f"starting the inference loop over {len(chunks)} chunk(s)")
         begin = time.time()
-        result = self.tts_model.generate(
-            all_entries,
-            all_attributes,
-            cfg_is_no_prefix=self.cfg_is_no_prefix,
-            cfg_is_no_text=self.cfg_is_no_text,
-            on_frame=callback,
-        )
-        frames = mx.concat(result.frames, axis=-1)
-        total_duration = frames.shape[0] * frames.shape[-1] / self.mimi.frame_rate
+        results = []
+        for chunk in chunks:
+            self._reset_streaming_state()
+            results.append(self.tts_model.generate(
+                [self.tts_model.prepare_script([chunk])],
+                all_attributes,
+                cfg_is_no_prefix=self.cfg_is_no_prefix,
+                cfg_is_no_text=self.cfg_is_no_text,
+                on_frame=callback,
+            ))
+        result = _merge_results(results)
+        if on_frame_callback is None:
+            # Counted as frames were decoded; no end-of-generation aggregation
+            total_duration = self._total_samples / self.mimi.sample_rate
+        elif result.frames:
+            # A custom callback does its own decoding, so the duration
+            # comes from the frame shapes (no concat, no device sync)
+            n_steps = sum(frame.shape[-1] for frame in result.frames)
+            total_duration = result.frames[0].shape[0] * n_steps / self.mimi.frame_rate
+        else:
+            total_duration = 0.0
         time_taken = time.time() - begin
-        total_speed = total_duration / time_taken
+        total_speed = total_duration / time_taken if time_taken > 0 else 0.0
         self.logger.info(f"[LM] took {time_taken:.2f}s, total speed {total_speed:.2f}x")
         
         return result
         
+    def reset(self):
+        """Drop pending frames and reset the LM caches and Mimi's streaming state.
+        
+        Call between unrelated texts so a new utterance doesn't continue
+        from the previous one's history.
+        """
+        if self.tts_model is None:
+            raise RuntimeError("Engine not initialized. Call initialize() first.")
+        self.wav_frames = []
+        self._reset_streaming_state()
+        
     def get_audio_frames(self) -> List[np.ndarray]:
-        frames = []
-        while True:
-            try:
-                frames.append(self.wav_frames.get_nowait())
-            except queue.Empty:
-                break
-        return frames
+        """Drain the pending frames, syncing them to numpy with a single eval."""
+        frames, self.wav_frames = self.wav_frames, []
+        if not frames:
+            return []
+        mx.eval(frames)
+        return [np.array(frame) for frame in frames]
+        
+    def iter_audio_frames(self) -> Iterator[np.ndarray]:
+        """Drain the pending frames, yielding them one numpy array at a time.
+        
+        Each device frame is released once yielded, so a consumer that
+        writes frames out as they come never holds the whole stream twice.
+        """
+        frames, self.wav_frames = self.wav_frames, []
+        if frames:
+            mx.eval(frames)
+        return self._release_frames(frames)
+        
+    @staticmethod
+    def _release_frames(frames: List[mx.array]) -> Iterator[np.ndarray]:
+        for i, frame in enumerate(frames):
+            frames[i] = None
+            yield np.array(frame)
+        
+    def get_audio_buffer(self) -> np.ndarray:
+        """Drain the pending frames into a single preallocated float32 buffer.
+        
+        Unlike concatenating get_audio_frames(), each frame is copied only
+        once, straight into its slot in the output.
+        """
+        frames, self.wav_frames = self.wav_frames, []
+        out = np.empty(sum(frame.shape[-1] for frame in frames), dtype=np.float32)
+        if frames:
+            mx.eval(frames)
+            offset = 0
+            for frame in frames:
+                end = offset + frame.shape[-1]
+                out[offset:end] = frame
+                offset = end
+        return out
         
     @property
     def sample_rate(self) -> int:
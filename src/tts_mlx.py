@@ -9,13 +9,12 @@
 # ///
 
 import argparse
-import queue
 import sys
+import threading
 import time
+from collections import deque
 
 import numpy as np
-import sounddevice as sd
-import sphn
 from moshi_mlx.models.tts import (
     DEFAULT_DSM_TTS_REPO,
     DEFAULT_DSM_TTS_VOICE_REPO,
@@ -26,6 +25,29 @@ from .config import AudioConfig, TTSConfig
 from .logger import Logger
 
 
+def _wait_for_playback(stream, playback_done, wav_frames, sample_rate, logger) -> bool:
+    """Block until the audio callback has played up to the end marker.
+    
+    The wait is bounded by the duration of the audio still buffered plus
+    AudioConfig.PLAYBACK_TIMEOUT_MARGIN, and gives up early if the stream
+    stops (a device error or an exception in the callback), so a stalled
+    output can't hang the process.
+    
+    Returns:
+        True if playback reached the end marker, False otherwise
+    """
+    buffered = len(wav_frames) * AudioConfig.DEFAULT_BLOCKSIZE / sample_rate
+    deadline = time.monotonic() + buffered + AudioConfig.PLAYBACK_TIMEOUT_MARGIN
+    while not playback_done.wait(AudioConfig.PLAYBACK_CHECK_INTERVAL):
+        if not stream.active:
+            logger.warning("audio stream stopped before playback finished")
+            return False
+        if time.monotonic() >= deadline:
+            logger.warning(f"playback did not finish within {buffered:.1f}s of buffered audio")
+            return False
+    return True
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Run Kyutai TTS using the PyTorch implementation"
@@ -51,7 +73,15 @@ def main():
     parser.add_argument(
         "--quantize",
         type=int,
-        help="The quantization to be applied, e.g. 8 for 8 bits.",
+        default=TTSConfig.DEFAULT_QUANTIZATION,
+        help="The quantization to be applied, e.g. 8 for 8 bits (default: %(default)s).",
+    )
+    parser.add_argument(
+        "--no-quantize",
+        dest="quantize",
+        action="store_const",
+        const=None,
+        help="Run the model without quantization.",
     )
     args = parser.parse_args()
 
@@ -79,7 +109,12 @@ def main():
     # Handle audio output
     if args.out == "-":
         # Play audio in real-time
-        wav_frames = queue.Queue()
+        import sounddevice as sd
+
+        # deque append/popleft are atomic, so the generation thread and the
+        # audio callback can share it without a lock. None marks the end.
+        wav_frames = deque()
+        playback_done = threading.Event()
 
         def custom_on_frame(frame):
             if (frame == -1).any():
@@ -87,33 +122,38 @@ def main():
             _pcm = engine.tts_model.mimi.decode_step(frame[:, :, None])
             _pcm = np.array(_pcm[0, 0])
             _pcm = np.clip(_pcm, AudioConfig.AUDIO_CLIP_MIN, AudioConfig.AUDIO_CLIP_MAX)
-            wav_frames.put_nowait(_pcm)
+            wav_frames.append(_pcm)
 
         def audio_callback(outdata, _a, _b, _c):
             try:
-                pcm_data = wav_frames.get(block=False)
-                outdata[:, 0] = pcm_data
-            except queue.Empty:
+                pcm_data = wav_frames.popleft()
+            except IndexError:
+                outdata[:] = 0
+                return
+            if pcm_data is None:
                 outdata[:] = 0
+                playback_done.set()
+            else:
+                outdata[:, 0] = pcm_data
 
         with sd.OutputStream(
             samplerate=engine.sample_rate,
             blocksize=AudioConfig.DEFAULT_BLOCKSIZE,
             channels=AudioConfig.DEFAULT_CHANNELS,
             callback=audio_callback,
-        ):
+        ) as stream:
             engine.generate_audio(text_to_tts, voice=args.voice, on_frame_callback=custom_on_frame)
-            time.sleep(AudioConfig.INITIAL_PLAYBACK_DELAY)
-            while True:
-                if wav_frames.qsize() == 0:
-                    break
-                time.sleep(AudioConfig.LOOP_PLAYBACK_DELAY)
+            # Wait for the callback to play every frame and reach the end
+            # marker; frames decoded late are never cut off
+            wav_frames.append(None)
+            _wait_for_playback(stream, playback_done, wav_frames, engine.sample_rate, logger)
     else:
         # Generate and save to file
         engine.generate_audio(text_to_tts, voice=args.voice)
-        frames = engine.get_audio_frames()
-        if frames:
-            wav = np.concatenate(frames, -1)
+        wav = engine.get_audio_buffer()
+        if wav.size:
+            import sphn
+
             sphn.write_wav(args.out, wav, engine.sample_rate)
 
 
@@ -1,6 +1,10 @@
-import requests
-from bs4 import BeautifulSoup
-from typing import Optional
+import importlib.util
+import sqlite3
+import time
+import httpx
+from lxml import etree
+from pathlib import Path
+from typing import NamedTuple, Optional
 import re
 
 try:
@@ -11,15 +15,173 @@ except ImportError:
     from logger import Logger
 
 
+# A line break plus surrounding whitespace and blank lines
+_LINE_BREAK_RE = re.compile(r'\s*\n\s*')
+# Markup with nothing to read: only whitespace and tags, and no <img> whose
+# alt text could be spoken. Matched with fullmatch, which stops at the first
+# character of text on any real page
+_BLANK_PAGE_RE = re.compile(r'(?:\s|<(?![iI][mM][gG])[a-zA-Z/!?][^>]*>)*')
+
+
+def _element_text(element: etree._Element, separator: str = ' ') -> str:
+    """Join the stripped, non-empty text nodes under an element."""
+    return separator.join(filter(None, map(str.strip, element.itertext())))
+
+
+def _freshness_lifetime(cache_control: str) -> Optional[float]:
+    """Seconds a response may be reused without revalidation.
+    
+    Follows the response's Cache-Control: max-age (capped at
+    URLExtractorConfig.RESPONSE_CACHE_TTL), always revalidate on no-cache,
+    and the TTL when neither is given. `private` needs no handling since
+    the cache belongs to a single user.
+    
+    Returns:
+        The lifetime in seconds, or None if the response must not be stored
+    """
+    directives = {}
+    for directive in cache_control.lower().split(','):
+        name, _, value = directive.partition('=')
+        directives[name.strip()] = value.strip().strip('"')
+    if 'no-store' in directives:
+        return None
+    if 'no-cache' in directives:
+        return 0.0
+    if 'max-age' in directives:
+        try:
+            max_age = max(int(directives['max-age']), 0)
+        except ValueError:
+            # An invalid max-age makes the response stale
+            return 0.0
+        return float(min(max_age, URLExtractorConfig.RESPONSE_CACHE_TTL))
+    return float(URLExtractorConfig.RESPONSE_CACHE_TTL)
+
+
+class CachedResponse(NamedTuple):
+    """A stored page and the validators needed to revalidate it."""
+    text: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched: float
+    max_age: float  # seconds after fetched that the page is served without revalidation
+    
+    def is_fresh(self) -> bool:
+        return time.time() - self.fetched < self.max_age
+
+
+class ResponseCache:
+    """On-disk LRU cache of fetched pages, revalidated with ETag/Last-Modified."""
+    
+    # Bumped whenever the table layout changes; older tables are dropped
+    _SCHEMA_VERSION = 1
+    
+    def __init__(self, path: Path, max_entries: int = URLExtractorConfig.RESPONSE_CACHE_MAX_ENTRIES):
+        """Initialize the cache.
+        
+        Args:
+            path: Location of the SQLite database file
+            max_entries: Number of pages kept before the least recently fetched are evicted
+        """
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self._conn = None
+    
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # Used by one thread at a time, but not always the one that opened
+            # it (run_batch fetches on a worker and closes from the main thread)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            with conn:
+                if conn.execute("PRAGMA user_version").fetchone()[0] != self._SCHEMA_VERSION:
+                    conn.execute("DROP TABLE IF EXISTS responses")
+                    conn.execute(f"PRAGMA user_version = {self._SCHEMA_VERSION}")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses "
+                    "(url TEXT PRIMARY KEY, text TEXT NOT NULL, etag TEXT, "
+                    "last_modified TEXT, fetched REAL NOT NULL, max_age REAL NOT NULL)"
+                )
+            self._conn = conn
+        return self._conn
+    
+    def get(self, url: str) -> Optional[CachedResponse]:
+        """Return the cached response for url, or None on a miss."""
+        row = self._connect().execute(
+            "SELECT text, etag, last_modified, fetched, max_age FROM responses WHERE url = ?", (url,)
+        ).fetchone()
+        return CachedResponse(*row) if row is not None else None
+    
+    def set(self, url: str, text: str, etag: Optional[str], last_modified: Optional[str],
+            max_age: float = URLExtractorConfig.RESPONSE_CACHE_TTL):
+        """Store a freshly fetched page, evicting the least recently fetched ones."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (url, text, etag, last_modified, fetched, max_age) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (url, text, etag, last_modified, time.time(), max_age),
+            )
+            conn.execute(
+                "DELETE FROM responses WHERE url NOT IN "
+                "(SELECT url FROM responses ORDER BY fetched DESC LIMIT ?)",
+                (self.max_entries,),
+            )
+    
+    def touch(self, url: str, max_age: Optional[float] = None):
+        """Mark a cached page as just revalidated, optionally with a new lifetime."""
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "UPDATE responses SET fetched = ?, max_age = COALESCE(?, max_age) WHERE url = ?",
+                (time.time(), max_age, url),
+            )
+    
+    def close(self):
+        """Close the database connection if it was opened."""
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
 class URLExtractor:
     """Extract human-readable text from URLs for TTS processing."""
     
-    def __init__(self):
+    _CONTENT_ELEMENTS = [*URLExtractorConfig.TEXT_ELEMENTS, 'img']
+    
+    def __init__(self, cache_path: Optional[Path] = None):
+        """Initialize the extractor.
+        
+        Args:
+            cache_path: SQLite file for caching fetched pages (e.g.
+                URLExtractorConfig.RESPONSE_CACHE_PATH); pages are not cached when None
+        """
         self.logger = Logger("URLExtractor")
-        self.session = requests.Session()
-        self.session.headers.update({
-            'User-Agent': URLExtractorConfig.USER_AGENT
-        })
+        self.cache = ResponseCache(cache_path) if cache_path is not None else None
+        # libxml2 HTML parser created once and reused for every parse; pages
+        # are fed to it as UTF-8 bytes
+        self._parser = etree.HTMLParser(encoding='utf-8', remove_pis=True)
+        # Pooled client; httpx advertises br/zstd in Accept-Encoding when the
+        # decoders are installed, and HTTP/2 is used when h2 is available.
+        # The transport retries connection failures (with backoff), never
+        # requests that already reached the server
+        self.client = httpx.Client(
+            headers={'User-Agent': URLExtractorConfig.USER_AGENT},
+            timeout=httpx.Timeout(
+                URLExtractorConfig.REQUEST_TIMEOUT,
+                connect=URLExtractorConfig.CONNECT_TIMEOUT,
+            ),
+            follow_redirects=True,
+            transport=httpx.HTTPTransport(
+                http2=importlib.util.find_spec("h2") is not None,
+                retries=URLExtractorConfig.CONNECT_RETRIES,
+            ),
+        )
+    
+    def close(self):
+        """Close the underlying HTTP connection pool and the response cache."""
+        self.client.close()
+        if self.cache is not None:
+            self.cache.close()
     
     def fetch_url(self, url: str) -> str:
         """Fetch content from a URL.
@@ -33,15 +195,122 @@ class URLExtractor:
         Raises:
             Exception: If the URL cannot be fetched
         """
+        if self.cache is not None:
+            return self._fetch_cached(url)
         try:
             self.logger.info(f"Fetching URL: {url}")
-            response = self.session.get(url, timeout=URLExtractorConfig.REQUEST_TIMEOUT)
+            _, text = self._get(url)
+            self.logger.info(f"Successfully fetched {len(text)} characters from {url}")
+            return text
+        except Exception as e:
+            self.logger.error(f"Failed to fetch URL {url}: {e}")
+            raise Exception(f"Failed to fetch URL: {e}")
+    
+    def _get(self, url: str, headers: Optional[dict] = None) -> tuple[httpx.Response, Optional[str]]:
+        """GET a URL, streaming at most URLExtractorConfig.MAX_PAGE_BYTES of its body.
+        
+        The body is decoded once, after the download, instead of being
+        buffered whole and then copied into a string.
+        
+        Returns:
+            Tuple of (response, text); text is None when a conditional
+            request (headers given) is answered with 304 Not Modified
+            
+        Raises:
+            httpx.HTTPError: If the request fails or returns an error status
+        """
+        limit = URLExtractorConfig.MAX_PAGE_BYTES
+        with self.client.stream('GET', url, headers=headers) as response:
+            if response.status_code == 304 and headers:
+                return response, None
             response.raise_for_status()
-            self.logger.info(f"Successfully fetched {len(response.text)} characters from {url}")
-            return response.text
+            
+            body = bytearray()
+            for chunk in response.iter_bytes():
+                body += chunk
+                if len(body) > limit:
+                    self.logger.warning(f"Page is larger than {limit} bytes, truncating {url}")
+                    del body[limit:]
+                    break
+        
+        return response, body.decode(response.encoding or 'utf-8', errors='replace')
+    
+    def _cache_get(self, url: str) -> Optional[CachedResponse]:
+        try:
+            return self.cache.get(url)
+        except (sqlite3.Error, OSError) as e:
+            self.logger.warning(f"Response cache unavailable: {e}")
+            return None
+    
+    def _cache_update(self, update, *args):
+        try:
+            update(*args)
+        except (sqlite3.Error, OSError) as e:
+            self.logger.warning(f"Failed to update response cache: {e}")
+    
+    def _fetch_cached(self, url: str) -> str:
+        """Fetch a URL through the response cache.
+        
+        Pages still within their freshness lifetime (see _freshness_lifetime)
+        are served without a request; older ones are revalidated with a
+        conditional GET and reused when the server answers 304 Not Modified.
+        """
+        cached = self._cache_get(url)
+        if cached is not None and cached.is_fresh():
+            self.logger.info(f"Using cached page for {url}")
+            return cached.text
+        
+        headers = {}
+        if cached is not None:
+            if cached.etag:
+                headers['If-None-Match'] = cached.etag
+            if cached.last_modified:
+                headers['If-Modified-Since'] = cached.last_modified
+        
+        try:
+            self.logger.info(f"Fetching URL: {url}")
+            response, text = self._get(url, headers=headers)
+            if text is None:
+                self.logger.info(f"Page not modified, using cached copy of {url}")
+                # Take the lifetime from the 304's Cache-Control (no-store on a
+                # 304 means revalidate every time); without one keep the stored lifetime
+                cache_control = response.headers.get('Cache-Control')
+                max_age = None
+                if cache_control is not None:
+                    max_age = _freshness_lifetime(cache_control) or 0.0
+                self._cache_update(self.cache.touch, url, max_age)
+                return cached.text
+            self.logger.info(f"Successfully fetched {len(text)} characters from {url}")
         except Exception as e:
             self.logger.error(f"Failed to fetch URL {url}: {e}")
             raise Exception(f"Failed to fetch URL: {e}")
+        
+        max_age = _freshness_lifetime(response.headers.get('Cache-Control', ''))
+        if max_age is not None:
+            self._cache_update(
+                self.cache.set, url, text,
+                response.headers.get('ETag'), response.headers.get('Last-Modified'), max_age
+            )
+        return text
+    
+    def _parse(self, html: str) -> Optional[etree._Element]:
+        """Parse HTML and strip script and style elements.
+        
+        Args:
+            html: The HTML content
+            
+        Returns:
+            The document root, shared by text and metadata extraction, or
+            None if the document is empty
+        """
+        self.logger.debug("Parsing HTML content")
+        root = etree.fromstring(html.encode('utf-8'), self._parser)
+        
+        # Remove script and style elements, keeping the text that follows them
+        if root is not None:
+            etree.strip_elements(root, *URLExtractorConfig.REMOVE_ELEMENTS, with_tail=False)
+        
+        return root
     
     def extract_text(self, html: str) -> str:
         """Extract human-readable text from HTML.
@@ -55,35 +324,32 @@ class URLExtractor:
         if not html:
             self.logger.warning("Empty HTML content provided")
             return ""
-            
-        self.logger.debug("Parsing HTML content")
-        soup = BeautifulSoup(html, URLExtractorConfig.DEFAULT_PARSER)
-        
-        # Remove script and style elements
-        for script in soup(URLExtractorConfig.REMOVE_ELEMENTS):
-            script.decompose()
+        if _BLANK_PAGE_RE.fullmatch(html):
+            self.logger.warning("HTML contains no text")
+            return ""
         
+        return self._extract_text_from_root(self._parse(html))
+    
+    def _extract_text_from_root(self, root: Optional[etree._Element]) -> str:
+        """Extract human-readable text from an already parsed document."""
         # Process the content
         text_parts = []
         processed_texts = set()  # Track processed text to avoid duplicates
         
-        # Process block-level elements that should be separated
-        for element in soup.find_all(URLExtractorConfig.TEXT_ELEMENTS):
-            # Get text with spaces preserved between inline elements
-            text = element.get_text(separator=' ', strip=True)
+        # Walk block-level text elements and images together in a single
+        # pass, so images are read out in document order
+        elements = root.iter(*self._CONTENT_ELEMENTS) if root is not None else ()
+        for element in elements:
+            if element.tag == 'img':
+                alt_text = element.get('alt', '').strip()
+                text = f"[Image: {alt_text}]" if alt_text else ""
+            else:
+                # Get text with spaces preserved between inline elements
+                text = _element_text(element)
             if text and text not in processed_texts:
                 processed_texts.add(text)
                 text_parts.append(text)
         
-        # Process images separately
-        for img in soup.find_all('img'):
-            alt_text = img.get('alt', '').strip()
-            if alt_text:
-                img_text = f"[Image: {alt_text}]"
-                if img_text not in processed_texts:
-                    processed_texts.add(img_text)
-                    text_parts.append(img_text)
-        
         # Join with double newlines for paragraph spacing
         result = '\n\n'.join(text_parts)
         self.logger.info(f"Extracted {len(text_parts)} text blocks, total {len(result)} characters")
@@ -98,18 +364,9 @@ class URLExtractor:
         Returns:
             Formatted text with proper spacing for TTS
         """
-        # Ensure consistent paragraph spacing
-        # Replace single newlines with double newlines if not already present
-        lines = text.split('\n')
-        formatted_lines = []
-        
-        for line in lines:
-            line = line.strip()
-            if line:
-                formatted_lines.append(line)
-        
-        # Join with double newlines for TTS pauses
-        return '\n\n'.join(formatted_lines)
+        # Collapse every line break, with any whitespace and blank lines
+        # around it, into one double newline for TTS pauses
+        return _LINE_BREAK_RE.sub('\n\n', text).strip()
     
     def extract_from_url(self, url: str) -> str:
         """Extract and format text from a URL for TTS.
@@ -127,31 +384,39 @@ class URLExtractor:
         text = self.extract_text(html)
         return self.format_for_tts(text)
     
-    def extract_metadata(self, html: str, url: str) -> dict:
+    def extract_metadata(self, html: str, url: str, skip_title: bool = False) -> dict:
         """Extract metadata including title and text from HTML.
         
         Args:
             html: The HTML content
             url: The source URL
+            skip_title: Leave 'title' empty instead of searching the tree for it
             
         Returns:
             Dictionary containing 'title', 'text', and 'url'
         """
-        soup = BeautifulSoup(html, URLExtractorConfig.DEFAULT_PARSER)
+        if not html:
+            self.logger.warning("Empty HTML content provided")
+            return {'title': "", 'text': "", 'url': url}
+        if _BLANK_PAGE_RE.fullmatch(html):
+            self.logger.warning("HTML contains no text")
+            return {'title': "", 'text': "", 'url': url}
+        
+        # Parse once; the title and the text come from the same tree
+        root = self._parse(html)
         
         # Extract title
         title = ""
-        title_tag = soup.find('title')
-        if title_tag:
-            title = title_tag.get_text(strip=True)
-        else:
-            # Fallback to first heading
-            first_heading = soup.find(['h1', 'h2', 'h3'])
-            if first_heading:
-                title = first_heading.get_text(strip=True)
+        if not skip_title and root is not None:
+            title_tag = root.find('.//title')
+            if title_tag is None:
+                # Fallback to first heading
+                title_tag = next(root.iter('h1', 'h2', 'h3'), None)
+            if title_tag is not None:
+                title = _element_text(title_tag, separator='')
         
         # Extract text content
-        text = self.extract_text(html)
+        text = self._extract_text_from_root(root)
         formatted_text = self.format_for_tts(text)
         
         return {
@@ -160,11 +425,12 @@ class URLExtractor:
             'url': url
         }
     
-    def extract_from_url_with_metadata(self, url: str) -> dict:
+    def extract_from_url_with_metadata(self, url: str, skip_title: bool = False) -> dict:
         """Extract text and metadata from a URL.
         
         Args:
             url: The URL to extract from
+            skip_title: Leave 'title' empty instead of searching the tree for it
             
         Returns:
             Dictionary containing 'title', 'text', and 'url'
@@ -173,4 +439,4 @@ class URLExtractor:
             Exception: If the URL cannot be processed
         """
         html = self.fetch_url(url)
-        return self.extract_metadata(html, url)
\ No newline at end of file
+        return self.extract_metadata(html, url, skip_title=skip_title)
\ No newline at end of file
@@ -3,24 +3,361 @@
 Convert URL content to speech and save as WAV file.
 """
 import argparse
-import numpy as np
-import soundfile as sf
+import hashlib
+import itertools
+import os
+import queue
+import shutil
 import sys
+import threading
+from pathlib import Path
+from typing import Optional
+from urllib.parse import urlparse
 try:
-    from .url_extractor import URLExtractor
-    from .tts_engine import TTSEngine
-    from .config import TTSConfig, URLExtractorConfig
+    from .config import AudioConfig, TTSConfig, URLExtractorConfig, default_model_dtype
     from .filename_generator import FilenameGenerator
     from .logger import Logger
 except ImportError:
-    from url_extractor import URLExtractor
-    from tts_engine import TTSEngine
-    from config import TTSConfig, URLExtractorConfig
+    from config import AudioConfig, TTSConfig, URLExtractorConfig, default_model_dtype
     from filename_generator import FilenameGenerator
     from logger import Logger
 
 
-def convert_url_to_wav(url, output_path=None, voice=TTSConfig.DEFAULT_VOICE, quantize=None, verbose=False):
+class AudioCache:
+    """On-disk LRU cache of synthesized WAV files."""
+    
+    # Running total of the bytes stored, so a store doesn't stat every entry.
+    # Concurrent processes can make it drift; each eviction recounts it
+    _SIZE_FILE = "size"
+    
+    def __init__(self, path: Path, max_bytes: int = TTSConfig.AUDIO_CACHE_MAX_BYTES):
+        """Initialize the cache.
+        
+        Args:
+            path: Directory holding the cached WAV files
+            max_bytes: Total size kept before the least recently used files are evicted
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+    
+    @staticmethod
+    def make_key(text: str, voice: str, quantize: Optional[int], dtype: str, hf_repo: str,
+                 sample_rate: int) -> str:
+        """Build the cache key for the text spoken and every setting that changes the audio."""
+        fields = (quantize, dtype, hf_repo, sample_rate, voice, text)
+        return hashlib.blake2b("\0".join(map(str, fields)).encode(), digest_size=16).hexdigest()
+    
+    def _entry(self, key: str) -> Path:
+        # Sharded by the first two hex digits to keep directories small
+        return self.path / key[:2] / f"{key[2:]}.wav"
+    
+    def get(self, key: str) -> Optional[Path]:
+        """Return the cached WAV file for key, or None on a miss."""
+        entry = self._entry(key)
+        try:
+            # The modification time doubles as the last access time
+            os.utime(entry)
+        except FileNotFoundError:
+            return None
+        return entry
+    
+    def set(self, key: str, wav_path):
+        """Store a copy of wav_path under key, evicting the least recently used files."""
+        entry = self._entry(key)
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        # Copied next to the entry and renamed, so readers never see a partial file
+        partial = entry.with_suffix('.partial')
+        shutil.copyfile(wav_path, partial)
+        added = partial.stat().st_size
+        try:
+            added -= entry.stat().st_size
+        except FileNotFoundError:
+            pass
+        total = self._stored_bytes() + added
+        os.replace(partial, entry)
+        # Only walk the directory once the limit is crossed
+        if total > self.max_bytes:
+            total = self._evict()
+        (self.path / self._SIZE_FILE).write_text(str(total))
+    
+    def _stored_bytes(self) -> int:
+        try:
+            return int((self.path / self._SIZE_FILE).read_text())
+        except (FileNotFoundError, ValueError):
+            # No counter yet, or a damaged one: count what is on disk
+            return sum(path.stat().st_size for path in self.path.glob('*/*.wav'))
+    
+    def _evict(self) -> int:
+        """Delete the least recently used files until the limit is met; returns the bytes kept."""
+        entries = [(path.stat(), path) for path in self.path.glob('*/*.wav')]
+        total = sum(stat.st_size for stat, _ in entries)
+        for stat, path in sorted(entries, key=lambda entry: entry[0].st_mtime):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= stat.st_size
+        return total
+
+
+def _audio_cache_key(text, voice, quantize):
+    """Key text by the settings _get_engine's engine will speak it with."""
+    return AudioCache.make_key(
+        text, voice, quantize, default_model_dtype(), TTSConfig.DEFAULT_HF_REPO,
+        AudioConfig.DEFAULT_SAMPLE_RATE
+    )
+
+
+def _cached_audio(audio_cache, key, logger):
+    try:
+        return audio_cache.get(key)
+    except OSError as e:
+        logger.warning(f"Audio cache unavailable: {e}")
+        return None
+
+
+def _store_audio(audio_cache, key, wav_path, logger):
+    try:
+        audio_cache.set(key, wav_path)
+    except OSError as e:
+        logger.warning(f"Failed to update audio cache: {e}")
+
+
+def _write_wav(path, frames, sample_rate) -> int:
+    """Stream audio frames into a 16-bit PCM mono WAV file.
+    
+    Args:
+        path: Path to save the WAV file
+        frames: Iterable of 1-D float audio frames
+        sample_rate: Sample rate in Hz
+        
+    Returns:
+        int: Number of samples written
+    """
+    import soundfile as sf
+    
+    n_samples = 0
+    # Format is explicit so any output name works and nothing is inferred
+    # from the file extension
+    with sf.SoundFile(path, mode='w', samplerate=sample_rate, channels=1,
+                      format='WAV', subtype='PCM_16') as wav:
+        for frame in frames:
+            wav.write(frame)
+            n_samples += len(frame)
+    return n_samples
+
+
+def _import_url_extractor():
+    """Import URLExtractor, deferred so --help and usage errors skip httpx/lxml."""
+    try:
+        from .url_extractor import URLExtractor
+    except ImportError:
+        from url_extractor import URLExtractor
+    return URLExtractor
+
+
+def _import_tts_engine():
+    """Import TTSEngine, deferred so --help and failed extractions skip MLX."""
+    try:
+        from .tts_engine import TTSEngine
+    except ImportError:
+        from tts_engine import TTSEngine
+    return TTSEngine
+
+
+# (quantize, engine) from the last conversion in this process; only one is
+# kept since each holds the whole model in memory
+_warm_engine = None
+
+
+def _has_warm_engine(quantize):
+    """Whether _get_engine(quantize) would reuse an engine instead of loading one."""
+    return _warm_engine is not None and _warm_engine[0] == quantize
+
+
+def _get_engine(quantize, logger):
+    """Return an initialized engine, reusing the one loaded by an earlier call.
+    
+    A reused engine is reset so the new text doesn't continue from the
+    previous one's decoder history.
+    """
+    global _warm_engine
+    if _has_warm_engine(quantize):
+        engine = _warm_engine[1]
+        # Start each article from clean LM caches and Mimi state
+        engine.reset()
+        return engine
+    
+    # Drop the old model before loading one with different settings
+    _warm_engine = None
+    logger.info("Initializing TTS engine...")
+    engine = _import_tts_engine()(quantize=quantize)
+    engine.initialize()
+    _warm_engine = (quantize, engine)
+    return engine
+
+
+def release_engine():
+    """Drop the engine kept for reuse so the memory its model holds is freed.
+    
+    Call once this process will run no more conversions.
+    """
+    global _warm_engine
+    _warm_engine = None
+
+
+def _prefetch_tts_checkpoints(logger):
+    """Download and page-cache the model files; best effort, run in background."""
+    try:
+        try:
+            from .tts_engine import fetch_checkpoints
+        except ImportError:
+            from tts_engine import fetch_checkpoints
+        fetch_checkpoints()
+    except Exception as e:
+        logger.debug(f"Checkpoint prefetch failed, loading will fetch them: {e}")
+
+
+def _check_url(url):
+    """Reject non-HTTP(S) URLs and URLs without a host before any work is started.
+    
+    Raises:
+        RuntimeError: If the URL is malformed
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ('http', 'https') or not parsed.netloc:
+        raise RuntimeError(f"Invalid URL: {url}")
+
+
+def _extract_text(extractor, url, logger, need_title=True):
+    """Extract the text and title for a URL.
+    
+    The title is only looked up when need_title is set, i.e. when an output
+    filename will have to be generated.
+    
+    Returns:
+        tuple: (text, title)
+        
+    Raises:
+        RuntimeError: If extraction fails or yields no text
+    """
+    try:
+        metadata = extractor.extract_from_url_with_metadata(url, skip_title=not need_title)
+    except Exception as e:
+        raise RuntimeError(f"Failed to extract text: {e}")
+    
+    text = metadata['text']
+    if not text:
+        raise RuntimeError("No text extracted from URL")
+    
+    logger.info(f"Extracted {len(text)} characters of text")
+    if logger.isEnabledFor(Logger.DEBUG):
+        logger.debug(f"First {URLExtractorConfig.VERBOSE_PREVIEW_LENGTH} characters: {text[:URLExtractorConfig.VERBOSE_PREVIEW_LENGTH]}...")
+    return text, metadata.get('title', '')
+
+
+def _name_output(text, title, url, output_path, logger, filename_gen=None, ai_filename=False):
+    """Return output_path, generating a filename when it is None.
+    
+    A shared filename_gen can be passed to reuse its Ollama connection and
+    cache; otherwise one is created when a filename has to be generated.
+    Filenames come from keywords unless ai_filename asks for Ollama.
+    """
+    if output_path is not None:
+        return output_path
+    
+    logger.info("Generating filename...")
+    owns_generator = filename_gen is None
+    if owns_generator:
+        filename_gen = FilenameGenerator()
+    generate = filename_gen.generate_from_content if ai_filename else filename_gen.generate_from_keywords
+    try:
+        output_path = generate(
+            text,
+            title=title or None,
+            url=url
+        )
+    finally:
+        if owns_generator:
+            filename_gen.close()
+    logger.info(f"Generated filename: {output_path}")
+    return output_path
+
+
+def _synthesize(engine, text, title, url, output_path, voice, logger, filename_gen=None, ai_filename=False):
+    """Speak text with an initialized engine and write it to a WAV file.
+    
+    See _name_output for how a missing output_path is filled in.
+    
+    Returns:
+        tuple: (output_path, duration in seconds)
+        
+    Raises:
+        RuntimeError: If no audio was generated
+    """
+    # Generate audio
+    logger.info(f"Generating audio with voice: {voice}")
+    
+    engine.generate_audio(text, voice=voice)
+    
+    # Frames are streamed into the file below; only the first is pulled
+    # now so an empty result is caught before naming the output
+    frames = engine.iter_audio_frames()
+    first_frame = next(frames, None)
+    if first_frame is None:
+        raise RuntimeError("No audio frames generated")
+    
+    output_path = _name_output(text, title, url, output_path, logger, filename_gen, ai_filename)
+    
+    # Save to WAV file
+    logger.info(f"Saving audio to: {output_path}")
+    logger.info(f"Sample rate: {engine.sample_rate} Hz")
+    
+    n_samples = _write_wav(output_path, itertools.chain([first_frame], frames), engine.sample_rate)
+    duration = n_samples / engine.sample_rate
+    logger.info(f"Duration: {duration:.2f} seconds")
+    
+    return output_path, duration
+
+
+def _convert_text(get_engine, text, title, url, output_path, voice, quantize, logger,
+                  audio_cache=None, filename_gen=None, ai_filename=False):
+    """Write the speech for text to a WAV file, reusing cached audio when possible.
+    
+    get_engine is called unless audio_cache already holds the audio, and
+    must return an initialized engine.
+    
+    Returns:
+        tuple: (output_path, duration in seconds)
+        
+    Raises:
+        RuntimeError: If no audio was generated
+    """
+    if audio_cache is None:
+        return _synthesize(
+            get_engine(), text, title, url, output_path, voice, logger, filename_gen, ai_filename
+        )
+    
+    key = _audio_cache_key(text, voice, quantize)
+    cached = _cached_audio(audio_cache, key, logger)
+    if cached is None:
+        output_path, duration = _synthesize(
+            get_engine(), text, title, url, output_path, voice, logger, filename_gen, ai_filename
+        )
+        _store_audio(audio_cache, key, output_path, logger)
+        return output_path, duration
+    
+    import soundfile as sf
+    
+    logger.info("Using cached audio")
+    output_path = _name_output(text, title, url, output_path, logger, filename_gen, ai_filename)
+    logger.info(f"Saving audio to: {output_path}")
+    shutil.copyfile(cached, output_path)
+    duration = sf.info(output_path).duration
+    logger.info(f"Duration: {duration:.2f} seconds")
+    return output_path, duration
+
+
+def convert_url_to_wav(url, output_path=None, voice=TTSConfig.DEFAULT_VOICE, quantize=TTSConfig.DEFAULT_QUANTIZATION, verbose=False, ai_filename=False, cache=True, cache_audio=False):
     """
     Convert URL content to speech and save as WAV file.
     
@@ -28,8 +365,12 @@ def convert_url_to_wav(url, output_path=None, voice=TTSConfig.DEFAULT_VOICE, qua
         url: URL to extract text from
         output_path: Path to save the WAV file
         voice: Voice to use for TTS
-        quantize: Quantization bits for the model (4 or 8)
+        quantize: Quantization bits for the model (4 or 8, None to disable)
         verbose: Enable verbose output
+        ai_filename: Name auto-generated files with Ollama instead of keywords
+        cache: Reuse and store fetched pages (URLExtractorConfig.RESPONSE_CACHE_PATH)
+        cache_audio: Reuse and store synthesized audio (TTSConfig.AUDIO_CACHE_DIR);
+            off by default since every output is then also copied into the cache
         
     Returns:
         bool: True if successful, False otherwise
@@ -40,75 +381,153 @@ def convert_url_to_wav(url, output_path=None, voice=TTSConfig.DEFAULT_VOICE, qua
     # Extract text from URL
     logger.info(f"Starting URL to WAV conversion for: {url}")
     
-    extractor = URLExtractor()
     try:
-        # Use metadata extraction if we need to generate filename
-        if output_path is None:
-            metadata = extractor.extract_from_url_with_metadata(url)
-            text = metadata['text']
-            title = metadata.get('title', '')
-        else:
-            text = extractor.extract_from_url(url)
-            title = None
-            
-        if not text:
-            logger.error("No text extracted from URL")
-            return False
-            
-        logger.info(f"Extracted {len(text)} characters of text")
-        logger.debug(f"First {URLExtractorConfig.VERBOSE_PREVIEW_LENGTH} characters: {text[:URLExtractorConfig.VERBOSE_PREVIEW_LENGTH]}...")
-    except Exception as e:
-        logger.error(f"Failed to extract text: {e}")
+        _check_url(url)
+    except RuntimeError as e:
+        logger.error(str(e))
         return False
     
-    # Initialize TTS engine
-    logger.info("Initializing TTS engine...")
-        
-    engine = TTSEngine(quantize=quantize)
-    engine.initialize()
+    # Fetch the model checkpoints while the page is downloaded and parsed,
+    # if a model is going to be loaded: not when an earlier call left one
+    # warm, and not with the audio cache, where a hit needs no model. The
+    # engine itself is only built once there is text to speak; a daemon
+    # thread lets a failed extraction return without waiting for it.
+    prefetch = None
+    if not cache_audio and not _has_warm_engine(quantize):
+        prefetch = threading.Thread(target=_prefetch_tts_checkpoints, args=(logger,), daemon=True)
+        prefetch.start()
     
-    # Generate audio
-    logger.info(f"Generating audio with voice: {voice}")
-        
-    result = engine.generate_audio(text, voice=voice)
-    
-    # Get all audio frames
-    frames = engine.get_audio_frames()
-    if not frames:
-        logger.error("No audio frames generated")
+    extractor = _import_url_extractor()(URLExtractorConfig.RESPONSE_CACHE_PATH if cache else None)
+    try:
+        text, title = _extract_text(extractor, url, logger, need_title=output_path is None)
+    except RuntimeError as e:
+        logger.error(str(e))
         return False
+    finally:
+        extractor.close()
     
-    # Concatenate all frames
-    audio = np.concatenate(frames)
+    def load_engine():
+        if prefetch is not None:
+            prefetch.join()
+        return _get_engine(quantize, logger)
     
-    # Generate filename if not provided
-    if output_path is None:
-        logger.info("Generating filename...")
-        filename_gen = FilenameGenerator()
-        output_path = filename_gen.generate_from_content(
-            text,
-            title=title if 'title' in locals() else None,
-            url=url
+    audio_cache = AudioCache(TTSConfig.AUDIO_CACHE_DIR) if cache_audio else None
+    try:
+        _convert_text(
+            load_engine, text, title, url, output_path, voice, quantize, logger,
+            audio_cache, ai_filename=ai_filename
         )
-        logger.info(f"Generated filename: {output_path}")
-    
-    # Save to WAV file
-    logger.info(f"Saving audio to: {output_path}")
-    logger.info(f"Sample rate: {engine.sample_rate} Hz")
-    logger.info(f"Duration: {len(audio) / engine.sample_rate:.2f} seconds")
-        
-    sf.write(output_path, audio, engine.sample_rate)
+    except RuntimeError as e:
+        logger.error(str(e))
+        return False
     
     logger.info("Conversion completed successfully")
     
     return True
 
 
+_BATCH_DONE = object()
+
+
+def _extract_batch(lines, extractor, logger, items):
+    """Parse batch lines and extract their text, in order, into items.
+    
+    Runs on a background thread; each item is (url, output_path, result),
+    where result is the (text, title) tuple or the exception raised.
+    """
+    try:
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line.strip():
+                continue
+            url, _, output_path = line.partition('\t')
+            url = url.strip()
+            output_path = output_path.strip() or None
+            
+            logger.info(f"Starting URL to WAV conversion for: {url}")
+            try:
+                _check_url(url)
+                result = _extract_text(extractor, url, logger, need_title=output_path is None)
+            except Exception as e:
+                result = e
+            items.put((url, output_path, result))
+    finally:
+        items.put(_BATCH_DONE)
+
+
+def run_batch(lines, voice=TTSConfig.DEFAULT_VOICE, quantize=TTSConfig.DEFAULT_QUANTIZATION, verbose=False, output=None, ai_filename=False, cache=True, cache_audio=False):
+    """
+    Convert many URLs with a single TTS engine.
+    
+    The engine is initialized on the first URL that is not in the audio
+    cache (unless an earlier call already loaded it), reused for every
+    following line and released once the batch is done. The next article is fetched and parsed
+    on a background thread while the current one is being synthesized.
+    
+    Args:
+        lines: Iterable of "url" or "url<TAB>output_path" lines
+        voice: Voice to use for TTS
+        quantize: Quantization bits for the model (4 or 8, None to disable)
+        verbose: Enable verbose output
+        output: Stream for the per-line status (defaults to stdout)
+        ai_filename: Name auto-generated files with Ollama instead of keywords
+        cache: Reuse and store fetched pages (URLExtractorConfig.RESPONSE_CACHE_PATH)
+        cache_audio: Reuse and store synthesized audio (TTSConfig.AUDIO_CACHE_DIR);
+            off by default since every output is then also copied into the cache
+        
+    Returns:
+        bool: True if every line was converted, False otherwise
+    """
+    logger = Logger("url_to_wav", level="debug" if verbose else "info")
+    output = output or sys.stdout
+    extractor = _import_url_extractor()(URLExtractorConfig.RESPONSE_CACHE_PATH if cache else None)
+    # One generator for the whole batch keeps the Ollama connection and
+    # the loaded model warm between articles
+    filename_gen = FilenameGenerator()
+    audio_cache = AudioCache(TTSConfig.AUDIO_CACHE_DIR) if cache_audio else None
+    success = True
+    
+    # Holds at most one extracted article ahead of the one being spoken
+    items = queue.Queue(maxsize=1)
+    producer = threading.Thread(
+        target=_extract_batch, args=(lines, extractor, logger, items), daemon=True
+    )
+    producer.start()
+    
+    try:
+        while True:
+            item = items.get()
+            if item is _BATCH_DONE:
+                break
+            url, output_path, extracted = item
+            try:
+                if isinstance(extracted, Exception):
+                    raise extracted
+                text, title = extracted
+                saved_path, duration = _convert_text(
+                    lambda: _get_engine(quantize, logger), text, title, url, output_path, voice, quantize, logger,
+                    audio_cache, filename_gen, ai_filename
+                )
+            except Exception as e:
+                logger.error(str(e))
+                output.write(f"ERR\t{output_path or url}\t{e}\n")
+                success = False
+            else:
+                output.write(f"OK\t{saved_path}\t{duration:.2f}\n")
+            output.flush()
+    finally:
+        filename_gen.close()
+        extractor.close()
+        release_engine()
+    
+    return success
+
+
 def main():
     parser = argparse.ArgumentParser(
         description="Convert URL content to speech and save as WAV file"
     )
-    parser.add_argument("url", help="URL to extract text from")
+    parser.add_argument("url", nargs="?", help="URL to extract text from")
     parser.add_argument(
         "-o", "--output",
         dest="output",
@@ -123,23 +542,73 @@ def main():
         "-q", "--quantize",
         type=int,
         choices=TTSConfig.ALLOWED_QUANTIZATION_LEVELS,
-        help="Quantization bits for the model"
+        default=TTSConfig.DEFAULT_QUANTIZATION,
+        help="Quantization bits for the model (default: %(default)s)"
+    )
+    parser.add_argument(
+        "--no-quantize",
+        dest="quantize",
+        action="store_const",
+        const=None,
+        help="Run the model without quantization"
     )
     parser.add_argument(
         "--verbose",
         action="store_true",
         help="Enable verbose output"
     )
+    parser.add_argument(
+        "--ai-filename",
+        action="store_true",
+        help="Name auto-generated files with Ollama instead of page keywords"
+    )
+    parser.add_argument(
+        "--no-cache",
+        dest="cache",
+        action="store_false",
+        help="Always fetch pages, without reading or updating the page cache"
+    )
+    parser.add_argument(
+        "--cache-audio",
+        action="store_true",
+        help="Reuse previously synthesized audio for unchanged text "
+             "(stores a copy of every output)"
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Read 'url[<TAB>output]' lines from stdin and convert them all "
+             "with one loaded model, printing OK/ERR per line"
+    )
     
     args = parser.parse_args()
     
-    success = convert_url_to_wav(
-        url=args.url,
-        output_path=args.output,
-        voice=args.voice,
-        quantize=args.quantize,
-        verbose=args.verbose
-    )
+    if args.batch:
+        if args.url or args.output:
+            parser.error("url and --output cannot be combined with --batch")
+        success = run_batch(
+            sys.stdin,
+            voice=args.voice,
+            quantize=args.quantize,
+            verbose=args.verbose,
+            ai_filename=args.ai_filename,
+            cache=args.cache,
+            cache_audio=args.cache_audio
+        )
+    elif args.url is None:
+        parser.error("the following arguments are required: url")
+    else:
+        success = convert_url_to_wav(
+            url=args.url,
+            output_path=args.output,
+            voice=args.voice,
+            quantize=args.quantize,
+            verbose=args.verbose,
+            ai_filename=args.ai_filename,
+            cache=args.cache,
+            cache_audio=args.cache_audio
+        )
+    release_engine()
     
     if not success:
         sys.exit(1)
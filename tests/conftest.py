@@ -0,0 +1,46 @@
+"""Shared pytest configuration."""
+import sys
+from unittest.mock import MagicMock
+
+import pytest
+
+# MLX and Moshi only run on Apple Silicon, so stand-ins replace them for the
+# whole session. They are installed from pytest_configure because test
+# modules import tts_engine during collection, before any fixture runs.
+_MOCKED_MODULES = (
+    'mlx',
+    'mlx.core',
+    'mlx.nn',
+    'sentencepiece',
+    'moshi_mlx',
+    'moshi_mlx.models',
+    'moshi_mlx.models.tts',
+    'moshi_mlx.utils',
+    'moshi_mlx.utils.loaders',
+    'moshi_mlx.client_utils',
+)
+_saved_modules = {}
+
+
+def pytest_configure(config):
+    for name in _MOCKED_MODULES:
+        _saved_modules[name] = sys.modules.get(name)
+        sys.modules[name] = MagicMock()
+
+
+def pytest_unconfigure(config):
+    # Only the mocked names are restored; modules imported during the
+    # session stay loaded
+    for name, module in _saved_modules.items():
+        if module is None:
+            sys.modules.pop(name, None)
+        else:
+            sys.modules[name] = module
+    _saved_modules.clear()
+
+
+@pytest.fixture(scope='session')
+def extract_url_cli():
+    """The extract_url_cli module, imported once per test session."""
+    import extract_url_cli
+    return extract_url_cli
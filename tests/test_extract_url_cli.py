@@ -1,23 +1,22 @@
-import subprocess
+import httpx
 import pytest
-from unittest.mock import patch, Mock, MagicMock
+from unittest.mock import patch, MagicMock
 import sys
-import os
 
 
-def test_cli_help():
+def test_cli_help(extract_url_cli, capsys):
     """Test CLI help output"""
-    result = subprocess.run(
-        ["uv", "run", "python", "src/extract_url_cli.py", "--help"],
-        capture_output=True,
-        text=True
-    )
-    assert result.returncode == 0
-    assert "Extract human-readable text from URLs" in result.stdout
-    assert "url" in result.stdout
+    with patch.object(sys, 'argv', ['extract_url_cli.py', '--help']), \
+            pytest.raises(SystemExit) as exc_info:
+        extract_url_cli.main()
+    
+    output = capsys.readouterr().out
+    assert exc_info.value.code == 0
+    assert "Extract human-readable text from URLs" in output
+    assert "url" in output
 
 
-def test_cli_with_mocked_url():
+def test_cli_with_mocked_url(extract_url_cli):
     """Test CLI with mocked URL extraction"""
     # Create a test HTML content
     test_html = """
@@ -31,16 +30,8 @@ def test_cli_with_mocked_url():
     </html>
     """
     
-    # Import the modules directly to test them
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
-    
-    with patch('requests.Session') as mock_session:
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.text = test_html
-        mock_session.return_value.get.return_value = mock_response
-        
-        from extract_url_cli import main
+    with patch('httpx.HTTPTransport.handle_request',
+               side_effect=lambda request: httpx.Response(200, text=test_html)):
         
         # Mock sys.argv to simulate command line arguments
         with patch.object(sys, 'argv', ['extract_url_cli.py', 'https://example.com']):
@@ -48,7 +39,7 @@ def test_cli_with_mocked_url():
             from io import StringIO
             captured_output = StringIO()
             with patch('sys.stdout', captured_output):
-                main()
+                extract_url_cli.main()
             
             output = captured_output.getvalue()
             assert "Test Page" in output
@@ -57,19 +48,12 @@ def test_cli_with_mocked_url():
             assert "Another paragraph." in output
 
 
-def test_cli_with_verbose():
+def test_cli_with_verbose(extract_url_cli):
     """Test CLI with verbose flag"""
     test_html = "<html><body><p>Test</p></body></html>"
     
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
-    
-    with patch('requests.Session') as mock_session:
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.text = test_html
-        mock_session.return_value.get.return_value = mock_response
-        
-        from extract_url_cli import main
+    with patch('httpx.HTTPTransport.handle_request',
+               side_effect=lambda request: httpx.Response(200, text=test_html)):
         
         # Mock sys.argv to simulate command line arguments with verbose flag
         with patch.object(sys, 'argv', ['extract_url_cli.py', '-v', 'https://example.com']):
@@ -78,7 +62,7 @@ def test_cli_with_verbose():
             captured_stdout = StringIO()
             captured_stderr = StringIO()
             with patch('sys.stdout', captured_stdout), patch('sys.stderr', captured_stderr):
-                main()
+                extract_url_cli.main()
             
             stdout_output = captured_stdout.getvalue()
             stderr_output = captured_stderr.getvalue()
@@ -90,14 +74,9 @@ def test_cli_with_verbose():
             assert "words" in stderr_output
 
 
-def test_cli_error_handling():
+def test_cli_error_handling(extract_url_cli):
     """Test CLI error handling"""
-    sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
-    
-    with patch('requests.Session') as mock_session:
-        mock_session.return_value.get.side_effect = Exception("Network error")
-        
-        from extract_url_cli import main
+    with patch('httpx.HTTPTransport.handle_request', side_effect=httpx.ConnectError("Network error")):
         
         # Mock sys.argv to simulate command line arguments
         with patch.object(sys, 'argv', ['extract_url_cli.py', 'https://example.com']):
@@ -105,7 +84,7 @@ def test_cli_error_handling():
             from io import StringIO
             captured_stderr = StringIO()
             with patch('sys.stderr', captured_stderr), pytest.raises(SystemExit) as exc_info:
-                main()
+                extract_url_cli.main()
             
             stderr_output = captured_stderr.getvalue()
             assert exc_info.value.code == 1
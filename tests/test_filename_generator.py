@@ -2,11 +2,19 @@
 import pytest
 from unittest.mock import Mock, patch
 from datetime import datetime
-import os
-import sys
 
-# Add src to path for direct imports
-sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+import filename_generator
+from filename_generator import FilenameCache, FilenameGenerator, _url_to_stem
+
+FIXED_LOCALTIME = datetime(2024, 1, 15, 14, 30, 52).timetuple()
+
+
+@pytest.fixture(autouse=True)
+def isolated_filename_cache(tmp_path, monkeypatch):
+    """Point the filename cache at a per-test database."""
+    monkeypatch.setattr(
+        filename_generator.OllamaConfig, 'FILENAME_CACHE_PATH', tmp_path / 'filename_cache.sqlite'
+    )
 
 
 class TestFilenameGenerator:
@@ -14,8 +22,6 @@ class TestFilenameGenerator:
     
     def test_init(self):
         """Test FilenameGenerator initialization."""
-        from filename_generator import FilenameGenerator
-        
         generator = FilenameGenerator()
         assert generator.model == "gemma2:latest"
         
@@ -25,8 +31,6 @@ class TestFilenameGenerator:
     
     def test_sanitize_filename(self):
         """Test filename sanitization."""
-        from filename_generator import FilenameGenerator
-        
         generator = FilenameGenerator()
         
         # Test basic sanitization
@@ -47,21 +51,17 @@ class TestFilenameGenerator:
     
     def test_add_timestamp(self):
         """Test timestamp addition to filename."""
-        from filename_generator import FilenameGenerator
-        
         generator = FilenameGenerator()
         
-        # Mock datetime to get consistent timestamp
-        with patch('filename_generator.datetime') as mock_datetime:
-            mock_datetime.now.return_value = datetime(2024, 1, 15, 14, 30, 52)
-            
+        # Freeze local time to get consistent timestamp
+        with patch('filename_generator.time.localtime', return_value=FIXED_LOCALTIME):
             result = generator.add_timestamp("test_file")
             assert result == "test_file_20240115_143052"
     
-    @patch('ollama.chat')
-    def test_generate_from_content_success(self, mock_chat):
+    @patch('ollama.Client')
+    def test_generate_from_content_success(self, mock_client_class):
         """Test successful filename generation from content."""
-        from filename_generator import FilenameGenerator
+        mock_chat = mock_client_class.return_value.chat
         
         # Mock Ollama response
         mock_chat.return_value = {
@@ -73,8 +73,7 @@ class TestFilenameGenerator:
         generator = FilenameGenerator()
         text = "Scientists report on the effects of climate change on polar ice caps..."
         
-        with patch('filename_generator.datetime') as mock_datetime:
-            mock_datetime.now.return_value = datetime(2024, 1, 15, 14, 30, 52)
+        with patch('filename_generator.time.localtime', return_value=FIXED_LOCALTIME):
             filename = generator.generate_from_content(text)
         
         assert filename == "climate_change_effects_20240115_143052.wav"
@@ -84,11 +83,16 @@ class TestFilenameGenerator:
         call_args = mock_chat.call_args
         assert call_args[1]['model'] == 'gemma2:latest'
         assert 'climate change' in call_args[1]['messages'][0]['content']
+        options = call_args[1]['options']
+        assert options['num_predict'] == 16
+        assert options['num_ctx'] == 512
+        assert options['temperature'] == 0
+        assert options['stop'] == ['\n']
     
-    @patch('ollama.chat')
-    def test_generate_from_content_with_title(self, mock_chat):
+    @patch('ollama.Client')
+    def test_generate_from_content_with_title(self, mock_client_class):
         """Test filename generation with title provided."""
-        from filename_generator import FilenameGenerator
+        mock_chat = mock_client_class.return_value.chat
         
         mock_chat.return_value = {
             'message': {
@@ -100,8 +104,7 @@ class TestFilenameGenerator:
         text = "Latest updates on the breaking news story..."
         title = "Breaking News: Major Discovery"
         
-        with patch('filename_generator.datetime') as mock_datetime:
-            mock_datetime.now.return_value = datetime(2024, 1, 15, 14, 30, 52)
+        with patch('filename_generator.time.localtime', return_value=FIXED_LOCALTIME):
             filename = generator.generate_from_content(text, title=title)
         
         assert filename == "breaking_news_update_20240115_143052.wav"
@@ -110,10 +113,28 @@ class TestFilenameGenerator:
         call_args = mock_chat.call_args
         assert 'Breaking News' in call_args[1]['messages'][0]['content']
     
-    @patch('ollama.chat')
-    def test_generate_from_content_ollama_error(self, mock_chat):
+    @patch('ollama.Client')
+    def test_generate_from_keywords(self, mock_client_class):
+        """Test the keyword-based filename, which never calls Ollama."""
+        generator = FilenameGenerator()
+        text = ("Scientists report on the effects of climate change on polar ice caps. "
+                "Climate change is accelerating, scientists warn.")
+        
+        with patch('filename_generator.time.localtime', return_value=FIXED_LOCALTIME):
+            from_text = generator.generate_from_keywords(text)
+            from_title = generator.generate_from_keywords(text, title="Breaking News: Major Discovery")
+            fallback = generator.generate_from_keywords("It is what it is", url="https://example.com/article")
+        
+        # Most frequent words, in the order they first appear
+        assert from_text == "scientists_climate_change_20240115_143052.wav"
+        assert from_title == "breaking_news_major_20240115_143052.wav"
+        assert fallback == "example_com_article_20240115_143052.wav"
+        mock_client_class.assert_not_called()
+    
+    @patch('ollama.Client')
+    def test_generate_from_content_ollama_error(self, mock_client_class):
         """Test fallback when Ollama fails."""
-        from filename_generator import FilenameGenerator
+        mock_chat = mock_client_class.return_value.chat
         
         # Mock Ollama to raise an exception
         mock_chat.side_effect = Exception("Ollama not available")
@@ -121,18 +142,17 @@ class TestFilenameGenerator:
         generator = FilenameGenerator()
         text = "Some content text"
         
-        with patch('filename_generator.datetime') as mock_datetime:
-            mock_datetime.now.return_value = datetime(2024, 1, 15, 14, 30, 52)
+        with patch('filename_generator.time.localtime', return_value=FIXED_LOCALTIME):
             filename = generator.generate_from_content(text, url="https://example.com/article")
         
         # Should fallback to URL-based naming
         assert filename == "example_com_article_20240115_143052.wav"
     
-    @patch('ollama.chat')
-    def test_generate_from_content_timeout(self, mock_chat):
+    @patch('ollama.Client')
+    def test_generate_from_content_timeout(self, mock_client_class):
         """Test timeout handling."""
-        from filename_generator import FilenameGenerator
         import time
+        mock_chat = mock_client_class.return_value.chat
         
         # Mock Ollama to simulate timeout
         def slow_response(*args, **kwargs):
@@ -145,23 +165,77 @@ class TestFilenameGenerator:
         text = "Some content"
         
         # For testing, we'll just verify the timeout parameter is passed
-        with patch('filename_generator.datetime') as mock_datetime:
-            mock_datetime.now.return_value = datetime(2024, 1, 15, 14, 30, 52)
+        with patch('filename_generator.time.localtime', return_value=FIXED_LOCALTIME):
             filename = generator.generate_from_content(text)
         
         # Verify timeout option was passed
         call_args = mock_chat.call_args
         assert 'options' in call_args[1]
         # Note: actual timeout implementation may vary based on ollama library
+        # The model is kept loaded between requests
+        assert call_args[1]['keep_alive'] == '30m'
+    
+    @patch('ollama.Client')
+    def test_client_reused_and_closed(self, mock_client_class):
+        """Test that one Ollama client is reused across calls and closed on exit."""
+        mock_client = mock_client_class.return_value
+        mock_client.chat.return_value = {'message': {'content': 'some_name'}}
+        
+        with FilenameGenerator() as generator:
+            generator.generate_from_content("First text")
+            generator.generate_from_content("Second text")
+        
+        mock_client_class.assert_called_once()
+        assert mock_client.chat.call_count == 2
+        mock_client.close.assert_called_once()
+    
+    @patch('ollama.Client')
+    def test_close_without_client_close(self, mock_client_class):
+        """Test that closing works with ollama releases whose Client has no close()."""
+        mock_client_class.return_value = Mock(spec=['chat'])
+        mock_client_class.return_value.chat.return_value = {'message': {'content': 'some_name'}}
+        
+        generator = FilenameGenerator()
+        generator.generate_from_content("Text")
+        generator.close()
+        
+        assert generator._client is None
+    
+    @patch('ollama.Client')
+    def test_generate_from_content_uses_cache(self, mock_client_class):
+        """Test that a repeated prompt is served from the cache without calling Ollama."""
+        mock_chat = mock_client_class.return_value.chat
+        mock_chat.return_value = {'message': {'content': 'Cached Topic'}}
+        
+        generator = FilenameGenerator()
+        with patch('filename_generator.time.localtime', return_value=FIXED_LOCALTIME):
+            first = generator.generate_from_content("Same text", title="Same title")
+            second = FilenameGenerator().generate_from_content("Same text", title="Same title")
+            other_model = FilenameGenerator(model="llama2").generate_from_content("Same text", title="Same title")
+        
+        assert first == second == "cached_topic_20240115_143052.wav"
+        assert other_model == first
+        # Only the first call and the different model reach Ollama
+        assert mock_chat.call_count == 2
+    
+    def test_filename_cache_evicts_least_recently_used(self, tmp_path):
+        """Test that the cache keeps at most max_entries stems."""
+        cache = FilenameCache(tmp_path / "cache.sqlite", max_entries=2)
+        cache.set("a", "stem_a")
+        cache.set("b", "stem_b")
+        assert cache.get("a") == "stem_a"
+        cache.set("c", "stem_c")
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == "stem_a"
+        assert cache.get("c") == "stem_c"
+        cache.close()
     
     def test_generate_from_url(self):
         """Test filename generation from URL."""
-        from filename_generator import FilenameGenerator
-        
         generator = FilenameGenerator()
         
-        with patch('filename_generator.datetime') as mock_datetime:
-            mock_datetime.now.return_value = datetime(2024, 1, 15, 14, 30, 52)
+        with patch('filename_generator.time.localtime', return_value=FIXED_LOCALTIME):
             
             # Test various URL formats
             assert generator.generate_from_url("https://example.com/article/news-story") == "example_com_news_story_20240115_143052.wav"
@@ -169,10 +243,23 @@ class TestFilenameGenerator:
             assert generator.generate_from_url("https://example.com") == "example_com_20240115_143052.wav"
             assert generator.generate_from_url("http://test.org/path?query=123") == "test_org_path_20240115_143052.wav"
     
-    @patch('ollama.chat')
-    def test_long_text_truncation(self, mock_chat):
+    def test_generate_from_url_caches_stem(self):
+        """Test that repeated URLs reuse the cached stem but get fresh timestamps."""
+        generator = FilenameGenerator()
+        url = "https://example.com/2024/cached-article"
+        generator.generate_from_url(url)
+        hits = _url_to_stem.cache_info().hits
+        
+        with patch('filename_generator.time.localtime', return_value=FIXED_LOCALTIME):
+            filename = generator.generate_from_url(url)
+        
+        assert filename == "example_com_cached_article_20240115_143052.wav"
+        assert _url_to_stem.cache_info().hits == hits + 1
+    
+    @patch('ollama.Client')
+    def test_long_text_truncation(self, mock_client_class):
         """Test that long text is truncated before sending to Ollama."""
-        from filename_generator import FilenameGenerator
+        mock_chat = mock_client_class.return_value.chat
         
         mock_chat.return_value = {
             'message': {
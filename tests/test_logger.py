@@ -0,0 +1,90 @@
+"""Tests for the Logger module."""
+from io import StringIO
+from unittest.mock import patch
+
+from src.logger import Logger
+
+
+class TestLogger:
+    def test_log_format(self):
+        """Test that messages include level and logger name"""
+        output = StringIO()
+        logger = Logger("test", output=output)
+        logger.info("hello")
+        assert "[INFO] [test] hello" in output.getvalue()
+
+    def test_level_filtering(self):
+        """Test that messages below the configured level are dropped"""
+        output = StringIO()
+        logger = Logger("test", level="warning", output=output)
+        logger.debug("debug message")
+        logger.info("info message")
+        logger.warning("warning message")
+        logger.error("error message")
+
+        result = output.getvalue()
+        assert "debug message" not in result
+        assert "info message" not in result
+        assert "warning message" in result
+        assert "error message" in result
+
+    def test_is_enabled_for(self):
+        """Test the level check exposed to call sites"""
+        logger = Logger("test", level="info", output=StringIO())
+        assert not logger.isEnabledFor("debug")
+        assert logger.isEnabledFor("info")
+        assert logger.isEnabledFor("error")
+        assert not logger.isEnabledFor(Logger.DEBUG)
+        assert logger.isEnabledFor(Logger.WARNING)
+
+    def test_level_change_applies_to_every_check(self):
+        """Test that setting level later is honoured by string and integer checks alike"""
+        output = StringIO()
+        logger = Logger("test", level="info", output=output)
+        logger.level = Logger.DEBUG
+        assert logger.isEnabledFor("debug")
+        assert logger.isEnabledFor(Logger.DEBUG)
+        logger.log("debug", "shown")
+
+        logger.level = Logger.ERROR
+        assert not logger.isEnabledFor("warning")
+        logger.log("warning", "hidden")
+        logger.warning("hidden too")
+        result = output.getvalue()
+        assert "[DEBUG] [test] shown" in result
+        assert "hidden" not in result
+
+    def test_generic_log_uses_level_name(self):
+        """Test that log() with a level string filters and formats like the helpers"""
+        output = StringIO()
+        logger = Logger("test", level="info", output=output)
+        logger.log("Warning", "careful")
+        logger.log("debug", "hidden")
+        result = output.getvalue()
+        assert "[WARNING] [test] careful" in result
+        assert "hidden" not in result
+
+    def test_lazy_formatting(self):
+        """Test that %-style args are formatted only when the message is output"""
+        output = StringIO()
+        logger = Logger("test", level="info", output=output)
+        logger.info("model: %s, count: %d", "gemma", 3)
+        assert "model: gemma, count: 3" in output.getvalue()
+
+        with patch.object(logger, "_make_log") as mock_make_log:
+            logger.debug("skipped %s", object())
+        mock_make_log.assert_not_called()
+
+    def test_timestamp_cached_within_second(self):
+        """Test that the timestamp is only reformatted when the second changes"""
+        logger = Logger("test", output=StringIO())
+        with patch("src.logger.time.time", side_effect=[100.1, 100.9, 101.0]), \
+                patch("src.logger.time.strftime", side_effect=["ts-100", "ts-101"]) as mock_strftime:
+            first = logger._make_log("INFO", "a")
+            second = logger._make_log("INFO", "b")
+            third = logger._make_log("INFO", "c")
+
+        assert first.startswith("[ts-100] [INFO]")
+        assert second.startswith("[ts-100] [INFO]")
+        assert third.startswith("[ts-101] [INFO]")
+        assert mock_strftime.call_count == 2
@@ -1,10 +1,6 @@
 import pytest
 from unittest.mock import patch
 import sys
-import os
-
-# Add parent directory to path to import main
-sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from main import main
 
 
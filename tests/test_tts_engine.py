@@ -1,24 +1,68 @@
-import queue
-from unittest.mock import Mock, patch, MagicMock
+from contextlib import ExitStack
+from types import SimpleNamespace
+from unittest.mock import ANY, MagicMock, Mock, call, patch
 import pytest
 import numpy as np
-import sys
-from pathlib import Path
+import threading
 
-# Mock the external dependencies before importing
-sys.modules['mlx'] = MagicMock()
-sys.modules['mlx.core'] = MagicMock()
-sys.modules['mlx.nn'] = MagicMock()
-sys.modules['sentencepiece'] = MagicMock()
-sys.modules['moshi_mlx'] = MagicMock()
-sys.modules['moshi_mlx.models'] = MagicMock()
-sys.modules['moshi_mlx.models.tts'] = MagicMock()
-sys.modules['moshi_mlx.utils'] = MagicMock()
-sys.modules['moshi_mlx.utils.loaders'] = MagicMock()
-sys.modules['moshi_mlx.client_utils'] = MagicMock()
+from src.config import TTSConfig
+from src.tts_engine import TTSEngine, default_model_dtype
 
-sys.path.insert(0, str(Path(__file__).parent.parent))
-from src.tts_engine import TTSEngine
+# LM output frames for the generate_audio tests; only their shapes are used
+_FAKE_FRAMES = tuple(np.zeros((8, 1, 480), dtype=np.float32) for _ in range(10))
+# Mimi output and an LM audio-token frame for the single-frame decode tests
+_PCM_STUB = np.zeros((1, 1, 1920), dtype=np.float32)
+_FRAME_STUB = np.zeros((8, 1), dtype=np.int32)
+
+
+def _tts_result(frames=(), end_step=0, consumption=(), transcript=()):
+    """Stand-in for one generate() result with a single batch item."""
+    return SimpleNamespace(
+        frames=list(frames),
+        logged_text_tokens=[],
+        end_steps=[end_step],
+        all_consumption_times=[list(consumption)],
+        all_transcripts=[list(transcript)],
+    )
+
+
+@pytest.fixture(autouse=True)
+def tts_result_type():
+    """Build merged results as namespaces; moshi_mlx's TTSResult is a mock here."""
+    with patch('src.tts_engine.TTSResult', SimpleNamespace):
+        yield
+
+
+@pytest.fixture
+def init_mocks():
+    """Patch everything TTSEngine.initialize() loads and wire a minimal model graph."""
+    targets = {
+        'hf_get': 'src.tts_engine.hf_get',
+        'models': 'src.tts_engine.models',
+        'sp': 'src.tts_engine.sentencepiece',
+        'tts_model': 'src.tts_engine.TTSModel',
+        'mx': 'src.tts_engine.mx',
+        'nn': 'src.tts_engine.nn',
+        'open': 'builtins.open',
+        'json_load': 'src.tts_engine.json.load',
+    }
+    with ExitStack() as stack:
+        mocks = SimpleNamespace(**{
+            name: stack.enter_context(patch(target)) for name, target in targets.items()
+        })
+        mocks.json_load.return_value = {
+            "mimi_name": "mimi.bin",
+            "moshi_name": "model.safetensors",
+            "tokenizer_name": "tokenizer.model"
+        }
+        mocks.hf_get.side_effect = lambda name, *args: name
+        mocks.models.LmConfig.from_config_dict.return_value.generated_codebooks = 8
+        mocks.lm = mocks.models.Lm.return_value
+        mocks.mimi_model = mocks.models.mimi.Mimi.return_value
+        mocks.tts = mocks.tts_model.return_value
+        mocks.tts.valid_cfg_conditionings = False
+        mocks.tts.mimi = MagicMock(sample_rate=24000, frame_rate=12.5)
+        yield mocks
 
 
 class TestTTSEngine:
@@ -26,23 +70,37 @@ class TestTTSEngine:
         engine = TTSEngine()
         assert engine.hf_repo is not None
         assert engine.voice_repo is not None
-        assert engine.quantize is None
+        assert engine.quantize == 4
+        assert engine.dtype == default_model_dtype()
+        assert engine.warmup is True
         assert engine.model is None
         assert engine.audio_tokenizer is None
         assert engine.text_tokenizer is None
         assert engine.tts_model is None
         assert engine.mimi is None
-        assert isinstance(engine.wav_frames, queue.Queue)
+        assert engine.wav_frames == []
 
     def test_init_with_params(self):
         engine = TTSEngine(
             hf_repo="custom/repo",
             voice_repo="custom/voice",
-            quantize=4
+            quantize=8,
+            dtype="bfloat16"
         )
         assert engine.hf_repo == "custom/repo"
         assert engine.voice_repo == "custom/voice"
-        assert engine.quantize == 4
+        assert engine.quantize == 8
+        assert engine.dtype == "bfloat16"
+
+    @pytest.mark.parametrize("mac_release, expected", [
+        ("", "float16"),
+        ("14.5", "float16"),
+        ("15.0.1", "float16"),
+        ("13.6", "bfloat16"),
+    ])
+    def test_default_model_dtype(self, mac_release, expected):
+        with patch('src.config.platform.mac_ver', return_value=(mac_release, ('', '', ''), '')):
+            assert default_model_dtype() == expected
 
     def test_logger_initialization(self):
         """Test that logger is properly initialized"""
@@ -50,42 +108,8 @@ class TestTTSEngine:
         assert hasattr(engine, 'logger')
         assert engine.logger.name == "TTSEngine"
 
-    @patch('src.tts_engine.hf_get')
-    @patch('src.tts_engine.models')
-    @patch('src.tts_engine.sentencepiece')
-    @patch('src.tts_engine.TTSModel')
-    @patch('src.tts_engine.mx')
-    @patch('builtins.open')
-    @patch('src.tts_engine.json.load')
-    def test_initialize(self, mock_json_load, mock_open, mock_mx, mock_tts_model, 
-                       mock_sp, mock_models, mock_hf_get):
-        mock_config = {
-            "mimi_name": "mimi.bin",
-            "moshi_name": "model.safetensors",
-            "tokenizer_name": "tokenizer.model"
-        }
-        mock_json_load.return_value = mock_config
-        mock_hf_get.side_effect = ["config.json", "config.json", "mimi.bin", "model.safetensors", "tokenizer.model"]
-        
-        mock_lm_config = Mock()
-        mock_lm_config.generated_codebooks = 8
-        mock_models.LmConfig.from_config_dict.return_value = mock_lm_config
-        
-        mock_lm = Mock()
-        mock_models.Lm.return_value = mock_lm
-        
-        mock_mimi_model = Mock()
-        mock_models.mimi.Mimi.return_value = mock_mimi_model
-        
-        mock_tokenizer = Mock()
-        mock_sp.SentencePieceProcessor.return_value = mock_tokenizer
-        
-        mock_tts = Mock()
-        mock_tts.valid_cfg_conditionings = False
-        mock_tts.mimi = Mock(sample_rate=24000, frame_rate=12.5)
-        mock_tts_model.return_value = mock_tts
-        
-        engine = TTSEngine()
+    def test_initialize(self, init_mocks):
+        engine = TTSEngine(quantize=None)
         engine.initialize()
         
         assert engine.model is not None
@@ -95,72 +119,123 @@ class TestTTSEngine:
         assert engine.mimi is not None
         assert engine.cfg_is_no_text == True
         assert engine.cfg_is_no_prefix == True
+        init_mocks.mx.eval.assert_called_once_with(
+            init_mocks.lm.parameters.return_value, init_mocks.mimi_model.parameters.return_value
+        )
 
-    @patch('src.tts_engine.hf_get')
-    @patch('src.tts_engine.models')
-    @patch('src.tts_engine.sentencepiece')
-    @patch('src.tts_engine.TTSModel')
-    @patch('src.tts_engine.mx')
-    @patch('src.tts_engine.nn')
-    @patch('builtins.open')
-    @patch('src.tts_engine.json.load')
-    def test_initialize_with_quantization(self, mock_json_load, mock_open, mock_nn, mock_mx, 
-                                         mock_tts_model, mock_sp, mock_models, mock_hf_get):
-        mock_config = {
-            "mimi_name": "mimi.bin",
-            "moshi_name": "model.safetensors",
-            "tokenizer_name": "tokenizer.model"
-        }
-        mock_json_load.return_value = mock_config
-        mock_hf_get.side_effect = ["config.json", "config.json", "mimi.bin", "model.safetensors", "tokenizer.model"]
-        
-        mock_lm_config = Mock()
-        mock_lm_config.generated_codebooks = 8
-        mock_models.LmConfig.from_config_dict.return_value = mock_lm_config
-        
-        mock_lm = Mock()
-        mock_lm.depformer = Mock()
-        mock_lm.transformer = Mock()
-        mock_lm.transformer.layers = [Mock(self_attn=Mock(), gating=Mock()) for _ in range(2)]
-        mock_models.Lm.return_value = mock_lm
-        
-        mock_mimi_model = Mock()
-        mock_models.mimi.Mimi.return_value = mock_mimi_model
-        
-        mock_tokenizer = Mock()
-        mock_sp.SentencePieceProcessor.return_value = mock_tokenizer
-        
-        mock_tts = Mock()
-        mock_tts.valid_cfg_conditionings = False
-        mock_tts.mimi = Mock(sample_rate=24000, frame_rate=12.5)
-        mock_tts_model.return_value = mock_tts
+    def test_initialize_with_quantization(self, init_mocks):
+        layer = SimpleNamespace(self_attn=SimpleNamespace(), gating=SimpleNamespace())
+        init_mocks.lm.transformer.layers = [layer]
         
         engine = TTSEngine(quantize=4)
         engine.initialize()
         
-        mock_nn.quantize.assert_called()
-        assert mock_nn.quantize.call_count >= 3
+        # Only the modules upstream moshi_mlx quantizes; the Mimi decoder
+        # transformer is quantized to 8 bits regardless of the LM bits
+        assert init_mocks.nn.quantize.call_args_list == [
+            call(init_mocks.lm.depformer, group_size=64, bits=4),
+            call(layer.self_attn, group_size=64, bits=4),
+            call(layer.gating, group_size=64, bits=4),
+            call(init_mocks.mimi_model.decoder_transformer, group_size=64, bits=8),
+        ]
+
+    def test_warmup_runs_hidden_generation(self):
+        engine = TTSEngine()
+        engine.tts_model = MagicMock()
+        engine.tts_model.multi_speaker = False
+        engine.cfg_coef_conditioning = None
+        engine.cfg_is_no_prefix = True
+        engine.cfg_is_no_text = True
+        lm_cache = Mock()
+        engine.tts_model.lm.transformer_cache = [lm_cache]
+
+        with patch('src.tts_engine.mx') as mock_mx:
+            engine._warmup()
+
+        engine.tts_model.prepare_script.assert_called_once_with(["warmup."])
+        on_frame = engine.tts_model.generate.call_args.kwargs['on_frame']
+        assert on_frame is not engine._on_frame
+        assert engine.wav_frames == []
+        # The warmup leaves no model state or RNG draws behind
+        lm_cache.reset.assert_called_once()
+        engine.tts_model.mimi.reset_all.assert_called_once()
+        mock_mx.random.seed.assert_called_once_with(TTSConfig.RANDOM_SEED)
+        mock_mx.clear_cache.assert_called_once()
+
+    def test_warmup_failure_is_not_fatal(self):
+        engine = TTSEngine()
+        engine.tts_model = MagicMock()
+        engine.tts_model.generate.side_effect = RuntimeError("metal error")
+        engine.cfg_coef_conditioning = None
+        engine.cfg_is_no_prefix = True
+        engine.cfg_is_no_text = True
+
+        with patch('src.tts_engine.mx') as mock_mx:
+            engine._warmup()
+
+        engine.tts_model.mimi.reset_all.assert_called_once()
+        mock_mx.random.seed.assert_called_once()
+
+    def test_initialize_fetches_checkpoints(self, init_mocks):
+        init_mocks.hf_get.side_effect = lambda name, *args: f"/cache/{name}"
+
+        engine = TTSEngine(hf_repo="custom/repo", quantize=None, warmup=False)
+        with patch('src.tts_engine._prefetch_file') as mock_prefetch:
+            engine.initialize()
+
+        # The config is resolved once and opened from the returned path
+        init_mocks.open.assert_called_once_with("/cache/config.json", "r")
+        assert init_mocks.hf_get.call_count == 4
+        for name in ("mimi.bin", "model.safetensors", "tokenizer.model"):
+            init_mocks.hf_get.assert_any_call(name, "custom/repo")
+            mock_prefetch.assert_any_call(f"/cache/{name}")
+        engine.model.load_pytorch_weights.assert_called_once_with(
+            "/cache/model.safetensors", init_mocks.models.LmConfig.from_config_dict.return_value, strict=True
+        )
+        init_mocks.sp.SentencePieceProcessor.assert_called_once_with("/cache/tokenizer.model")
+        engine.audio_tokenizer.load_pytorch_weights.assert_called_once_with("/cache/mimi.bin", strict=True)
+
+    def test_prefetch_file(self, tmp_path):
+        from src.tts_engine import _prefetch_file
+        weights = tmp_path / "weights.bin"
+        weights.write_bytes(b"\0" * 4096)
+        # Created when absent so the fadvise path is covered on macOS too
+        with patch('src.tts_engine.os.posix_fadvise', create=True) as mock_fadvise, \
+                patch('src.tts_engine.os.POSIX_FADV_WILLNEED', 3, create=True):
+            _prefetch_file(weights)
+            mock_fadvise.assert_called_once_with(ANY, 0, 0, 3)
+            
+            # Missing files are ignored
+            mock_fadvise.reset_mock()
+            _prefetch_file(tmp_path / "missing.bin")
+            mock_fadvise.assert_not_called()
 
     def test_on_frame(self):
         engine = TTSEngine()
         engine.tts_model = Mock()
         engine.tts_model.mimi = Mock()
         
-        mock_pcm = np.random.randn(1, 1, 1920)
-        engine.tts_model.mimi.decode_step.return_value = mock_pcm
-        
-        frame = np.random.randn(8, 1)
-        engine._on_frame(frame)
-        
-        assert engine.wav_frames.qsize() == 1
-        result = engine.wav_frames.get_nowait()
-        assert isinstance(result, np.ndarray)
+        engine.tts_model.mimi.decode_step.return_value = _PCM_STUB
+        
+        with patch('src.tts_engine.mx') as mock_mx, \
+                patch('src.tts_engine._finalize_pcm', side_effect=lambda pcm: np.clip(pcm[0, 0], -1, 1)):
+            engine._on_frame(_FRAME_STUB)
+            
+            assert len(engine.wav_frames) == 1
+            mock_mx.async_eval.assert_called_once()
+            
+            result = engine.get_audio_frames()
+            mock_mx.eval.assert_called_once()
+        
+        assert len(result) == 1
+        assert isinstance(result[0], np.ndarray)
+        assert engine.wav_frames == []
 
     def test_on_frame_with_negative_values(self):
         engine = TTSEngine()
         frame = np.array([[-1, -1, -1]])
         engine._on_frame(frame)
-        assert engine.wav_frames.qsize() == 0
+        assert len(engine.wav_frames) == 0
 
     def test_generate_audio_not_initialized(self):
         engine = TTSEngine()
@@ -169,55 +244,202 @@ class TestTTSEngine:
 
     def test_generate_audio(self):
         engine = TTSEngine()
-        engine.tts_model = Mock()
+        engine.tts_model = MagicMock()
+        engine.text_tokenizer = SimpleNamespace(encode=str.split)
         engine.tts_model.multi_speaker = True
         engine.tts_model.prepare_script.return_value = Mock()
         engine.tts_model.get_voice_path.return_value = "voice/path"
         engine.tts_model.make_condition_attributes.return_value = Mock()
         
-        mock_result = Mock()
-        mock_result.frames = [np.random.randn(8, 1, 480) for _ in range(10)]
+        mock_result = _tts_result(_FAKE_FRAMES, end_step=9, transcript=[("Test", 2)])
         engine.tts_model.generate.return_value = mock_result
         
-        engine.mimi = Mock(frame_rate=12.5)
+        engine.mimi = SimpleNamespace(frame_rate=12.5, sample_rate=24000)
         engine.cfg_coef_conditioning = None
         engine.cfg_is_no_prefix = False
         engine.cfg_is_no_text = False
         
         with patch('src.tts_engine.mx.concat') as mock_concat:
-            mock_concat.return_value = Mock(shape=(8, 4800))
             result = engine.generate_audio("Test text", voice="test_voice")
         
+        # A single chunk comes back as its own result, unchanged
         assert result == mock_result
-        engine.tts_model.prepare_script.assert_called_once()
+        # The duration is computed from frame shapes without concatenating
+        mock_concat.assert_not_called()
+        engine.tts_model.prepare_script.assert_called_once_with(["Test text"])
         engine.tts_model.get_voice_path.assert_called_once_with("test_voice")
         engine.tts_model.generate.assert_called_once()
 
     def test_generate_audio_with_custom_callback(self):
         engine = TTSEngine()
-        engine.tts_model = Mock()
+        engine.tts_model = MagicMock()
+        engine.text_tokenizer = SimpleNamespace(encode=str.split)
         engine.tts_model.multi_speaker = False
         engine.tts_model.prepare_script.return_value = Mock()
         engine.tts_model.make_condition_attributes.return_value = Mock()
         
-        mock_result = Mock()
-        mock_result.frames = [np.random.randn(8, 1, 480) for _ in range(10)]
+        mock_result = _tts_result(_FAKE_FRAMES)
         engine.tts_model.generate.return_value = mock_result
         
-        engine.mimi = Mock(frame_rate=12.5)
+        engine.mimi = SimpleNamespace(frame_rate=12.5, sample_rate=24000)
         engine.cfg_coef_conditioning = None
         engine.cfg_is_no_prefix = True
         engine.cfg_is_no_text = True
         
         custom_callback = Mock()
         
-        with patch('src.tts_engine.mx.concat') as mock_concat:
-            mock_concat.return_value = Mock(shape=(8, 4800))
-            result = engine.generate_audio("Test text", on_frame_callback=custom_callback)
+        result = engine.generate_audio("Test text", on_frame_callback=custom_callback)
         
         generate_call = engine.tts_model.generate.call_args
         assert generate_call.kwargs['on_frame'] == custom_callback
 
+    def test_generate_audio_long_text_is_chunked(self):
+        engine = TTSEngine()
+        engine.tts_model = MagicMock()
+        engine.text_tokenizer = SimpleNamespace(encode=str.split)
+        engine.tts_model.multi_speaker = True
+        engine.tts_model.generate.side_effect = [
+            _tts_result(_FAKE_FRAMES[:4], end_step=3, consumption=[0, 2], transcript=[("One", 1)]),
+            _tts_result(_FAKE_FRAMES[4:], end_step=5, consumption=[1], transcript=[("Five", 2)]),
+        ]
+        engine.mimi = SimpleNamespace(frame_rate=12.5, sample_rate=24000)
+        engine.cfg_coef_conditioning = None
+        engine.cfg_is_no_prefix = False
+        engine.cfg_is_no_text = False
+        
+        with patch('src.tts_engine.TTSConfig.MAX_CHUNK_TOKENS', 4):
+            result = engine.generate_audio("One two. Three four!\n\nFive six seven? Eight.")
+        
+        scripts = [c.args[0] for c in engine.tts_model.prepare_script.call_args_list]
+        assert scripts == [["One two. Three four!"], ["Five six seven? Eight."]]
+        assert engine.tts_model.generate.call_count == 2
+        # Voice conditioning is computed once and reused for every chunk
+        engine.tts_model.get_voice_path.assert_called_once()
+        # The chunks merge into one result, with steps counted from the start
+        assert result.frames == list(_FAKE_FRAMES)
+        assert result.end_steps == [9]
+        assert result.all_consumption_times == [[0, 2, 5]]
+        assert result.all_transcripts == [[("One", 1), ("Five", 6)]]
+        
+    def test_generate_audio_resets_state_before_each_chunk(self):
+        engine = TTSEngine()
+        engine.tts_model = MagicMock()
+        engine.text_tokenizer = SimpleNamespace(encode=str.split)
+        engine.tts_model.multi_speaker = False
+        engine.mimi = SimpleNamespace(frame_rate=12.5, sample_rate=24000)
+        engine.cfg_coef_conditioning = None
+        engine.cfg_is_no_prefix = False
+        engine.cfg_is_no_text = False
+        lm_cache, depformer_cache = Mock(), Mock()
+        engine.tts_model.lm.transformer_cache = [lm_cache]
+        engine.tts_model.lm.depformer_cache = [depformer_cache]
+        
+        events = []
+        engine.tts_model.mimi.reset_all.side_effect = lambda: events.append("reset")
+        
+        def generate(*args, **kwargs):
+            events.append("generate")
+            return _tts_result()
+        engine.tts_model.generate.side_effect = generate
+        
+        with patch('src.tts_engine.TTSConfig.MAX_CHUNK_TOKENS', 2):
+            engine.generate_audio("One two. Three four.")
+        
+        assert events == ["reset", "generate", "reset", "generate"]
+        assert lm_cache.reset.call_count == 2
+        assert depformer_cache.reset.call_count == 2
+        
+    def test_reset_streaming_state_without_reset_all(self):
+        engine = TTSEngine()
+        engine.tts_model = MagicMock()
+        engine.tts_model.lm.transformer_cache = []
+        engine.tts_model.lm.depformer_cache = []
+        # moshi_mlx before 0.3 has no Mimi.reset_all()
+        mimi = Mock(spec=["reset_state", "upsample", "downsample"])
+        engine.tts_model.mimi = mimi
+        
+        engine._reset_streaming_state()
+        
+        mimi.reset_state.assert_called_once()
+        mimi.upsample.reset_state.assert_called_once()
+        mimi.downsample.reset_state.assert_called_once()
+        
+    def test_generate_audio_blank_text(self):
+        engine = TTSEngine()
+        engine.tts_model = MagicMock()
+        engine.text_tokenizer = SimpleNamespace(encode=str.split)
+        engine.tts_model.multi_speaker = False
+        engine.mimi = SimpleNamespace(frame_rate=12.5, sample_rate=24000)
+        engine.cfg_coef_conditioning = None
+        engine.cfg_is_no_prefix = False
+        engine.cfg_is_no_text = False
+        
+        # A frozen clock would make the speed a division by zero
+        with patch('src.tts_engine.time.time', return_value=100.0):
+            result = engine.generate_audio("  \n ")
+        
+        engine.tts_model.generate.assert_not_called()
+        assert result.frames == []
+        assert engine.wav_frames == []
+        
+    def _engine_emitting_frames(self, n_frames):
+        engine = TTSEngine()
+        engine.tts_model = MagicMock()
+        engine.text_tokenizer = SimpleNamespace(encode=str.split)
+        engine.tts_model.multi_speaker = False
+        engine.mimi = SimpleNamespace(frame_rate=12.5, sample_rate=24000)
+        engine.cfg_coef_conditioning = None
+        engine.cfg_is_no_prefix = False
+        engine.cfg_is_no_text = False
+        
+        def generate(*args, on_frame, **kwargs):
+            for i in range(n_frames):
+                on_frame(np.full((8, 1), i))
+            return _tts_result()
+        engine.tts_model.generate.side_effect = generate
+        return engine
+
+    def test_generate_audio_decodes_inline(self):
+        engine = self._engine_emitting_frames(20)
+        decode_threads = set()
+        
+        def decode_step(frame):
+            decode_threads.add(threading.get_ident())
+            return np.full((1, 1, 1920), frame[0, 0, 0])
+        engine.tts_model.mimi.decode_step.side_effect = decode_step
+        
+        with patch('src.tts_engine.mx'), \
+                patch('src.tts_engine._finalize_pcm', side_effect=lambda pcm: pcm[0, 0]):
+            engine.generate_audio("Test text")
+        
+        # All frames are decoded, in order, by the time generate_audio returns
+        assert [int(frame[0]) for frame in engine.wav_frames] == list(range(20))
+        # MLX graphs are only evaluated from the calling thread
+        assert decode_threads == {threading.get_ident()}
+        # Samples are counted as frames are decoded
+        assert engine._total_samples == 20 * 1920
+
+    def test_generate_audio_raises_decode_error(self):
+        engine = self._engine_emitting_frames(3)
+        engine.tts_model.mimi.decode_step.side_effect = ValueError("bad frame")
+        
+        with patch('src.tts_engine.mx'):
+            with pytest.raises(ValueError, match="bad frame"):
+                engine.generate_audio("Test text")
+
+    def test_chunk_text_keeps_long_sentence_whole(self):
+        engine = TTSEngine()
+        engine.text_tokenizer = SimpleNamespace(encode=str.split)
+        with patch('src.tts_engine.TTSConfig.MAX_CHUNK_TOKENS', 2):
+            chunks = engine._chunk_text("A very long sentence here. Short.")
+        assert chunks == ["A very long sentence here.", "Short."]
+
+    @pytest.mark.parametrize("text", ["", "   ", "\n\n"])
+    def test_chunk_text_blank(self, text):
+        engine = TTSEngine()
+        engine.text_tokenizer = SimpleNamespace(encode=str.split)
+        assert engine._chunk_text(text) == []
+
     def test_get_audio_frames_empty(self):
         engine = TTSEngine()
         frames = engine.get_audio_frames()
@@ -225,14 +447,59 @@ class TestTTSEngine:
 
     def test_get_audio_frames_with_data(self):
         engine = TTSEngine()
-        test_frames = [np.random.randn(1920) for _ in range(5)]
-        for frame in test_frames:
-            engine.wav_frames.put(frame)
+        test_frames = [np.arange(1920, dtype=np.float32) + i for i in range(5)]
+        engine.wav_frames.extend(test_frames)
         
         result = engine.get_audio_frames()
         assert len(result) == 5
-        for i, frame in enumerate(result):
-            np.testing.assert_array_equal(frame, test_frames[i])
+        assert np.array_equal(np.stack(result), np.stack(test_frames))
+
+    def test_iter_audio_frames(self):
+        engine = TTSEngine()
+        test_frames = [np.full(4, i, dtype=np.float32) for i in range(3)]
+        engine.wav_frames.extend(test_frames)
+        with patch('src.tts_engine.mx') as mock_mx:
+            frames = engine.iter_audio_frames()
+            assert engine.wav_frames == []
+            result = list(frames)
+            mock_mx.eval.assert_called_once()
+        
+        assert len(result) == 3
+        assert np.array_equal(np.stack(result), np.stack(test_frames))
+
+    def test_get_audio_buffer(self):
+        engine = TTSEngine()
+        test_frames = [np.full(4, i, dtype=np.float32) for i in range(3)]
+        engine.wav_frames.extend(test_frames)
+        
+        result = engine.get_audio_buffer()
+        assert result.dtype == np.float32
+        np.testing.assert_array_equal(result, np.concatenate(test_frames))
+        assert engine.wav_frames == []
+
+    def test_get_audio_buffer_empty(self):
+        engine = TTSEngine()
+        result = engine.get_audio_buffer()
+        assert result.size == 0
+
+    def test_reset(self):
+        engine = TTSEngine()
+        engine.tts_model = MagicMock()
+        lm_cache, depformer_cache = Mock(), Mock()
+        engine.tts_model.lm.transformer_cache = [lm_cache]
+        engine.tts_model.lm.depformer_cache = [depformer_cache]
+        engine.wav_frames.append(np.zeros(4))
+        engine.reset()
+        assert engine.wav_frames == []
+        # Both LM caches and the whole Mimi state, upsampler included
+        lm_cache.reset.assert_called_once()
+        depformer_cache.reset.assert_called_once()
+        engine.tts_model.mimi.reset_all.assert_called_once()
+
+    def test_reset_not_initialized(self):
+        engine = TTSEngine()
+        with pytest.raises(RuntimeError, match="Engine not initialized"):
+            engine.reset()
 
     def test_sample_rate_not_initialized(self):
         engine = TTSEngine()
@@ -241,7 +508,7 @@ class TestTTSEngine:
 
     def test_sample_rate(self):
         engine = TTSEngine()
-        engine.mimi = Mock(sample_rate=24000)
+        engine.mimi = SimpleNamespace(sample_rate=24000)
         assert engine.sample_rate == 24000
 
     def test_frame_rate_not_initialized(self):
@@ -251,51 +518,19 @@ class TestTTSEngine:
 
     def test_frame_rate(self):
         engine = TTSEngine()
-        engine.mimi = Mock(frame_rate=12.5)
+        engine.mimi = SimpleNamespace(frame_rate=12.5, sample_rate=24000)
         assert engine.frame_rate == 12.5
 
-    @patch('src.tts_engine.hf_get')
-    @patch('src.tts_engine.models')
-    @patch('src.tts_engine.sentencepiece')
-    @patch('src.tts_engine.TTSModel')
-    @patch('src.tts_engine.mx')
-    @patch('builtins.open')
-    @patch('src.tts_engine.json.load')
-    def test_initialize_with_valid_cfg_conditionings(self, mock_json_load, mock_open, mock_mx, 
-                                                    mock_tts_model, mock_sp, mock_models, mock_hf_get):
+    def test_initialize_with_valid_cfg_conditionings(self, init_mocks):
         """Test initialization when tts_model has valid_cfg_conditionings=True (covers lines 91-94)."""
-        mock_config = {
-            "mimi_name": "mimi.bin",
-            "moshi_name": "model.safetensors",
-            "tokenizer_name": "tokenizer.model"
-        }
-        mock_json_load.return_value = mock_config
-        mock_hf_get.side_effect = ["config.json", "config.json", "mimi.bin", "model.safetensors", "tokenizer.model"]
-        
-        mock_lm_config = Mock()
-        mock_lm_config.generated_codebooks = 8
-        mock_models.LmConfig.from_config_dict.return_value = mock_lm_config
-        
-        mock_lm = Mock()
-        mock_models.Lm.return_value = mock_lm
+        init_mocks.tts.valid_cfg_conditionings = True  # This triggers the code path we want to test
+        init_mocks.tts.cfg_coef = 2.5  # Some test value
         
-        mock_mimi_model = Mock()
-        mock_models.mimi.Mimi.return_value = mock_mimi_model
-        
-        mock_tokenizer = Mock()
-        mock_sp.SentencePieceProcessor.return_value = mock_tokenizer
-        
-        mock_tts = Mock()
-        mock_tts.valid_cfg_conditionings = True  # This triggers the code path we want to test
-        mock_tts.cfg_coef = 2.5  # Some test value
-        mock_tts.mimi = Mock(sample_rate=24000, frame_rate=12.5)
-        mock_tts_model.return_value = mock_tts
-        
-        engine = TTSEngine()
+        engine = TTSEngine(quantize=None)
         engine.initialize()
         
         # Verify the cfg_coef was stored and reset
         assert engine.cfg_coef_conditioning == 2.5
-        assert mock_tts.cfg_coef == 1.0
+        assert init_mocks.tts.cfg_coef == 1.0
         assert engine.cfg_is_no_text == False
-        assert engine.cfg_is_no_prefix == False
\ No newline at end of file
+        assert engine.cfg_is_no_prefix == False
@@ -0,0 +1,40 @@
+import threading
+from collections import deque
+from types import SimpleNamespace
+from unittest.mock import Mock, patch
+
+from src.tts_mlx import _wait_for_playback
+
+
+def test_wait_for_playback_finished():
+    """Test that the wait returns as soon as the end marker has been played."""
+    done = threading.Event()
+    done.set()
+    logger = Mock()
+
+    assert _wait_for_playback(SimpleNamespace(active=True), done, deque([None]), 24000, logger)
+    logger.warning.assert_not_called()
+
+
+@patch('src.tts_mlx.AudioConfig.PLAYBACK_CHECK_INTERVAL', 0.01)
+def test_wait_for_playback_stream_stopped():
+    """Test that a stream that stopped playing ends the wait instead of hanging."""
+    logger = Mock()
+
+    assert not _wait_for_playback(
+        SimpleNamespace(active=False), threading.Event(), deque([None]), 24000, logger
+    )
+    logger.warning.assert_called_once()
+
+
+@patch('src.tts_mlx.AudioConfig.PLAYBACK_CHECK_INTERVAL', 0.01)
+@patch('src.tts_mlx.AudioConfig.PLAYBACK_TIMEOUT_MARGIN', 0.05)
+def test_wait_for_playback_times_out():
+    """Test that the wait gives up once the buffered audio should have played."""
+    logger = Mock()
+
+    # A single 1920-sample frame at 192 kHz is 10 ms of audio
+    assert not _wait_for_playback(
+        SimpleNamespace(active=True), threading.Event(), deque([None]), 192000, logger
+    )
+    logger.warning.assert_called_once()
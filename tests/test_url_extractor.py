@@ -1,109 +1,192 @@
+import gzip
+import httpx
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import patch
+from src.config import URLExtractorConfig
 from src.url_extractor import URLExtractor
 
+_PAGE = "<html><head></head><body>{body}</body></html>"
+_TITLED_PAGE = "<html><head><title>Title</title></head><body><p>Body text.</p></body></html>"
+
+
+def _serve(*responses):
+    """Answer the extractor's HTTP requests with responses, in order."""
+    return patch('src.url_extractor.httpx.HTTPTransport.handle_request', side_effect=list(responses))
+
+
+@pytest.fixture(scope="class")
+def extractor():
+    """One extractor, and one HTTP client, shared by every test in the class."""
+    extractor = URLExtractor()
+    yield extractor
+    extractor.close()
 
-class TestURLExtractor:
-    def setup_method(self):
-        self.extractor = URLExtractor()
 
-    def test_fetch_url_success(self):
+class TestURLExtractor:
+    def test_fetch_url_success(self, extractor):
         """Test successful URL fetching"""
-        with patch('src.url_extractor.requests.Session.get') as mock_get:
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_response.text = "<html><body>Test content</body></html>"
-            mock_get.return_value = mock_response
-            
-            result = self.extractor.fetch_url("https://example.com")
+        with _serve(httpx.Response(200, text="<html><body>Test content</body></html>")) as mock_send:
+            result = extractor.fetch_url("https://example.com")
             assert result == "<html><body>Test content</body></html>"
-            mock_get.assert_called_once_with("https://example.com", timeout=10)
+            mock_send.assert_called_once()
+            assert mock_send.call_args.args[0].url == "https://example.com"
+
+    def test_fetch_url_truncates_large_page(self, extractor, monkeypatch):
+        """Test that the body is read up to the page size limit"""
+        monkeypatch.setattr(URLExtractorConfig, 'MAX_PAGE_BYTES', 8)
+        with _serve(httpx.Response(200, text="<p>Long page</p>")):
+            assert extractor.fetch_url("https://example.com") == "<p>Long "
+
+    def test_fetch_url_uses_response_charset(self, extractor):
+        """Test that the body is decoded with the charset from Content-Type"""
+        response = httpx.Response(
+            200, content="<p>Café</p>".encode('latin-1'),
+            headers={'Content-Type': 'text/html; charset=ISO-8859-1'}
+        )
+        with _serve(response):
+            assert extractor.fetch_url("https://example.com") == "<p>Café</p>"
 
-    def test_fetch_url_failure(self):
+    def test_fetch_url_decodes_gzip(self, extractor):
+        """Test that compression is requested and the body is decompressed"""
+        response = httpx.Response(
+            200, content=gzip.compress(b"<p>Zipped</p>"), headers={'Content-Encoding': 'gzip'}
+        )
+        with _serve(response) as mock_send:
+            assert extractor.fetch_url("https://example.com") == "<p>Zipped</p>"
+        assert 'gzip' in mock_send.call_args.args[0].headers['Accept-Encoding']
+
+    def test_client_timeouts(self, extractor):
+        """Test that connecting has a shorter timeout than the whole request"""
+        timeout = extractor.client.timeout
+        assert timeout.connect == URLExtractorConfig.CONNECT_TIMEOUT
+        assert timeout.read == URLExtractorConfig.REQUEST_TIMEOUT
+
+    def test_fetch_url_failure(self, extractor):
         """Test URL fetching with network error"""
-        with patch('src.url_extractor.requests.Session.get') as mock_get:
-            mock_get.side_effect = Exception("Network error")
-            
+        with _serve(httpx.ConnectError("Network error")):
             with pytest.raises(Exception) as exc_info:
-                self.extractor.fetch_url("https://example.com")
+                extractor.fetch_url("https://example.com")
             assert "Failed to fetch URL" in str(exc_info.value)
 
-    def test_extract_text_simple_html(self):
-        """Test text extraction from simple HTML"""
-        html = """
-        <html>
-            <body>
-                <p>This is a paragraph.</p>
-                <p>This is another paragraph.</p>
-            </body>
-        </html>
-        """
-        result = self.extractor.extract_text(html)
-        assert "This is a paragraph." in result
-        assert "This is another paragraph." in result
-        # Check for proper spacing between paragraphs
-        assert "\n\n" in result
-
-    def test_extract_text_with_images(self):
-        """Test text extraction including image alt tags"""
-        html = """
-        <html>
-            <body>
-                <p>Before image</p>
-                <img src="test.jpg" alt="A beautiful sunset">
-                <p>After image</p>
-            </body>
-        </html>
-        """
-        result = self.extractor.extract_text(html)
-        assert "Before image" in result
-        assert "[Image: A beautiful sunset]" in result
-        assert "After image" in result
+    def test_fetch_url_cached(self, tmp_path):
+        """Test that a freshly cached page is served without a second request"""
+        extractor = URLExtractor(cache_path=tmp_path / "responses.sqlite")
+        with _serve(httpx.Response(200, headers={'ETag': '"v1"'}, text="<p>Page</p>")) as mock_send:
+            assert extractor.fetch_url("https://example.com") == "<p>Page</p>"
+            assert extractor.fetch_url("https://example.com") == "<p>Page</p>"
+        extractor.close()
+        
+        assert mock_send.call_count == 1
 
-    def test_extract_text_skip_scripts_and_styles(self):
-        """Test that script and style tags are skipped"""
-        html = """
-        <html>
-            <head>
-                <style>body { color: red; }</style>
-            </head>
-            <body>
-                <p>Visible text</p>
-                <script>console.log('invisible');</script>
-            </body>
-        </html>
-        """
-        result = self.extractor.extract_text(html)
-        assert "Visible text" in result
-        assert "color: red" not in result
-        assert "console.log" not in result
+    def test_fetch_url_revalidates_stale_page(self, tmp_path, monkeypatch):
+        """Test that an expired page is revalidated and reused on 304 Not Modified"""
+        monkeypatch.setattr(URLExtractorConfig, 'RESPONSE_CACHE_TTL', 0)
+        extractor = URLExtractor(cache_path=tmp_path / "responses.sqlite")
+        validators = {'ETag': '"v1"', 'Last-Modified': 'Wed, 14 Oct 2026 08:00:00 GMT'}
+        with _serve(httpx.Response(200, headers=validators, text="<p>Page</p>"),
+                    httpx.Response(304)) as mock_send:
+            extractor.fetch_url("https://example.com")
+            assert extractor.fetch_url("https://example.com") == "<p>Page</p>"
+        extractor.close()
+        
+        request = mock_send.call_args.args[0]
+        assert request.headers['If-None-Match'] == '"v1"'
+        assert request.headers['If-Modified-Since'] == 'Wed, 14 Oct 2026 08:00:00 GMT'
 
-    def test_extract_text_decode_entities(self):
-        """Test HTML entity decoding"""
-        html = """
-        <html>
-            <body>
-                <p>This &amp; that</p>
-                <p>&quot;Quoted text&quot;</p>
-                <p>&lt;tag&gt;</p>
-            </body>
-        </html>
-        """
-        result = self.extractor.extract_text(html)
-        assert "This & that" in result
-        assert '"Quoted text"' in result
-        assert "<tag>" in result
+    @pytest.mark.parametrize("cache_control, max_age, requests", [
+        pytest.param(None, 3600, 1, id="default-ttl"),
+        pytest.param("public, max-age=60", 60, 1, id="max-age"),
+        pytest.param("max-age=86400", 3600, 1, id="max-age-capped"),
+        pytest.param("max-age=0", 0, 2, id="max-age-zero"),
+        pytest.param("private, no-cache", 0, 2, id="no-cache"),
+    ])
+    def test_fetch_url_cache_control(self, tmp_path, cache_control, max_age, requests):
+        """Test that the response's Cache-Control sets how long it is served unrevalidated"""
+        extractor = URLExtractor(cache_path=tmp_path / "responses.sqlite")
+        headers = {'ETag': '"v1"'}
+        if cache_control is not None:
+            headers['Cache-Control'] = cache_control
+        with _serve(httpx.Response(200, headers=headers, text="<p>Page</p>"),
+                    httpx.Response(304)) as mock_send:
+            assert extractor.fetch_url("https://example.com") == "<p>Page</p>"
+            assert extractor.cache.get("https://example.com").max_age == max_age
+            assert extractor.fetch_url("https://example.com") == "<p>Page</p>"
+        extractor.close()
+        
+        assert mock_send.call_count == requests
 
-    def test_format_for_tts(self):
+    def test_fetch_url_no_store_not_cached(self, tmp_path):
+        """Test that responses marked no-store are never written to the cache"""
+        extractor = URLExtractor(cache_path=tmp_path / "responses.sqlite")
+        with _serve(httpx.Response(200, headers={'Cache-Control': 'no-store'}, text="<p>Page</p>")):
+            extractor.fetch_url("https://example.com")
+        assert extractor.cache.get("https://example.com") is None
+        extractor.close()
+
+    @pytest.mark.parametrize("body, expected_in, expected_not_in", [
+        pytest.param(
+            "<p>This is a paragraph.</p><p>This is another paragraph.</p>",
+            # Paragraphs are separated by a blank line
+            ["This is a paragraph.", "This is another paragraph.", "\n\n"],
+            [],
+            id="paragraphs",
+        ),
+        pytest.param(
+            '<p>Before image</p><img src="test.jpg" alt="A beautiful sunset"><p>After image</p>',
+            ["Before image", "[Image: A beautiful sunset]", "After image"],
+            [],
+            id="image-alt",
+        ),
+        pytest.param(
+            '<p>Before image</p><img src="test.jpg"><p>After image</p>',
+            ["Before image", "After image"],
+            # Images without alt text get no placeholder
+            ["[Image:"],
+            id="image-without-alt",
+        ),
+        pytest.param(
+            "<style>body { color: red; }</style><p>Visible text</p>"
+            "<script>console.log('invisible');</script>",
+            ["Visible text"],
+            ["color: red", "console.log"],
+            id="scripts-and-styles",
+        ),
+        pytest.param(
+            "<p>Inline <script>console.log('invisible');</script>script</p>",
+            ["Inline script"],
+            ["console.log"],
+            id="script-inside-paragraph",
+        ),
+        pytest.param(
+            "<p>This &amp; that</p><p>&quot;Quoted text&quot;</p><p>&lt;tag&gt;</p>",
+            ["This & that", '"Quoted text"', "<tag>"],
+            [],
+            id="entities",
+        ),
+    ])
+    def test_extract_text(self, extractor, body, expected_in, expected_not_in):
+        """Test text extraction from small HTML pages"""
+        result = extractor.extract_text(_PAGE.format(body=body))
+        for text in expected_in:
+            assert text in result
+        for text in expected_not_in:
+            assert text not in result
+
+    def test_format_for_tts(self, extractor):
         """Test text formatting for TTS"""
         text = "Paragraph one.\nParagraph two.\n\nParagraph three."
-        result = self.extractor.format_for_tts(text)
+        result = extractor.format_for_tts(text)
         # Should ensure double line breaks between paragraphs
         assert "Paragraph one.\n\nParagraph two.\n\nParagraph three." in result
 
-    def test_extract_from_url_integration(self):
+    def test_format_for_tts_strips_whitespace_lines(self, extractor):
+        """Test that padded and whitespace-only lines are normalized"""
+        text = "  One. \r\n \t \n\n  Two  words.\t\n"
+        assert extractor.format_for_tts(text) == "One.\n\nTwo  words."
+
+    def test_extract_from_url_integration(self, extractor):
         """Test the complete extraction process"""
-        with patch.object(self.extractor, 'fetch_url') as mock_fetch:
+        with patch.object(extractor, 'fetch_url') as mock_fetch:
             mock_fetch.return_value = """
             <html>
                 <body>
@@ -115,7 +198,7 @@ class TestURLExtractor:
             </html>
             """
             
-            result = self.extractor.extract_from_url("https://example.com")
+            result = extractor.extract_from_url("https://example.com")
             assert "Title" in result
             assert "First paragraph." in result
             assert "[Image: Test image]" in result
@@ -123,7 +206,7 @@ class TestURLExtractor:
             # Check proper spacing
             assert result.count("\n\n") >= 3  # Between title and paragraphs
 
-    def test_extract_text_complex_html(self):
+    def test_extract_text_complex_html(self, extractor):
         """Test extraction from complex HTML with nested elements"""
         html = """
         <html>
@@ -142,39 +225,38 @@ class TestURLExtractor:
             </body>
         </html>
         """
-        result = self.extractor.extract_text(html)
+        result = extractor.extract_text(html)
         assert "Main Title" in result
         assert "First bold paragraph with link" in result
         assert "List item 1" in result
         assert "List item 2" in result
         assert "Final paragraph." in result
 
-    def test_extract_text_empty_html(self):
+    def test_extract_text_xml_declaration(self, extractor):
+        """Test that XHTML pages with an encoding declaration still parse"""
+        html = '<?xml version="1.0" encoding="UTF-8"?>' + _PAGE.format(body="<p>Café</p>")
+        assert extractor.extract_text(html) == "Café"
+
+    @pytest.mark.parametrize("html, expected", [
+        pytest.param("<html>\n<head></head>\n<body><div> </div></body></html>", "", id="blank"),
+        pytest.param(_PAGE.format(body='<img src="a.jpg" alt="Chart">'), "[Image: Chart]", id="image-only"),
+        pytest.param(_PAGE.format(body="<p>< 2</p>"), "< 2", id="bare-angle-bracket"),
+    ])
+    def test_extract_text_blank_page_shortcut(self, extractor, html, expected):
+        """Test that pages without text skip parsing, and pages with any text don't"""
+        with patch.object(extractor, '_parse', wraps=extractor._parse) as mock_parse:
+            assert extractor.extract_text(html) == expected
+        assert mock_parse.called == bool(expected)
+
+    def test_extract_text_empty_html(self, extractor):
         """Test extraction from empty or minimal HTML"""
-        result = self.extractor.extract_text("<html><body></body></html>")
+        result = extractor.extract_text("<html><body></body></html>")
         assert result.strip() == ""
         
-        result = self.extractor.extract_text("")
+        result = extractor.extract_text("")
         assert result.strip() == ""
 
-    def test_extract_text_image_without_alt(self):
-        """Test handling of images without alt attribute"""
-        html = """
-        <html>
-            <body>
-                <p>Before image</p>
-                <img src="test.jpg">
-                <p>After image</p>
-            </body>
-        </html>
-        """
-        result = self.extractor.extract_text(html)
-        assert "Before image" in result
-        assert "After image" in result
-        # Should not include any image placeholder for images without alt
-        assert "[Image:" not in result
-    
-    def test_extract_metadata(self):
+    def test_extract_metadata(self, extractor):
         """Test extraction of metadata including title"""
         html = """
         <html>
@@ -187,14 +269,14 @@ class TestURLExtractor:
             </body>
         </html>
         """
-        result = self.extractor.extract_metadata(html, "https://example.com/page")
+        result = extractor.extract_metadata(html, "https://example.com/page")
         
         assert result['title'] == "Test Page Title"
         assert result['url'] == "https://example.com/page"
         assert "Main Heading" in result['text']
         assert "Some content here." in result['text']
     
-    def test_extract_metadata_no_title(self):
+    def test_extract_metadata_no_title(self, extractor):
         """Test metadata extraction when no title tag exists"""
         html = """
         <html>
@@ -204,32 +286,44 @@ class TestURLExtractor:
             </body>
         </html>
         """
-        result = self.extractor.extract_metadata(html, "https://example.com")
+        result = extractor.extract_metadata(html, "https://example.com")
         
         # Should fallback to first heading or empty string
         assert result['title'] in ["First Heading", ""]
         assert result['url'] == "https://example.com"
         assert "Content without title tag." in result['text']
     
-    def test_extract_from_url_with_metadata(self):
+    def test_extract_metadata_parses_once(self, extractor):
+        """Test that title and text extraction share a single parse"""
+        with patch.object(extractor, '_parse', wraps=extractor._parse) as mock_parse:
+            result = extractor.extract_metadata(_TITLED_PAGE, "https://example.com")
+        
+        assert mock_parse.call_count == 1
+        assert result['title'] == "Title"
+        assert "Body text." in result['text']
+
+    def test_extract_metadata_skip_title(self, extractor):
+        """Test that the title lookup can be skipped when it isn't needed"""
+        result = extractor.extract_metadata(_TITLED_PAGE, "https://example.com", skip_title=True)
+
+        assert result['title'] == ""
+        assert "Body text." in result['text']
+
+    def test_extract_from_url_with_metadata(self, extractor):
         """Test the full extraction pipeline returning metadata"""
-        with patch('src.url_extractor.requests.Session.get') as mock_get:
-            mock_response = Mock()
-            mock_response.status_code = 200
-            mock_response.text = """
-            <html>
-                <head>
-                    <title>Article Title</title>
-                </head>
-                <body>
-                    <h1>Main Article</h1>
-                    <p>Article content.</p>
-                </body>
-            </html>
-            """
-            mock_get.return_value = mock_response
-            
-            result = self.extractor.extract_from_url_with_metadata("https://example.com/article")
+        html = """
+        <html>
+            <head>
+                <title>Article Title</title>
+            </head>
+            <body>
+                <h1>Main Article</h1>
+                <p>Article content.</p>
+            </body>
+        </html>
+        """
+        with _serve(httpx.Response(200, text=html)):
+            result = extractor.extract_from_url_with_metadata("https://example.com/article")
             
             assert isinstance(result, dict)
             assert result['title'] == "Article Title"
@@ -2,249 +2,510 @@
 """
 Test suite for URL to WAV conversion functionality.
 """
-import unittest
-from unittest.mock import Mock, patch, MagicMock, call
+import os
+import sys
+import threading
+from io import StringIO
+from pathlib import Path
+from types import SimpleNamespace
+from unittest.mock import MagicMock, Mock, patch
 import numpy as np
+import pytest
+from soundfile import SoundFile
 from src import url_to_wav
+from src.url_to_wav import _prefetch_tts_checkpoints
 
 
-class TestURLToWav(unittest.TestCase):
-    
-    @patch('src.url_to_wav.sf')
-    @patch('src.url_to_wav.TTSEngine')
-    @patch('src.url_to_wav.URLExtractor')
-    def test_basic_url_to_wav_conversion(self, mock_extractor_class, mock_tts_engine_class, mock_sf):
-        """Test basic URL to WAV conversion flow."""
-        # Setup mocks
-        mock_extractor = mock_extractor_class.return_value
-        mock_extractor.extract_from_url.return_value = "Hello world from the URL"
-        
-        mock_engine = mock_tts_engine_class.return_value
-        mock_engine.sample_rate = 24000
-        mock_engine.get_audio_frames.return_value = [
-            np.array([0.1, 0.2, 0.3]),
-            np.array([0.4, 0.5, 0.6])
-        ]
-        
-        # Call the function
-        result = url_to_wav.convert_url_to_wav(
-            url="https://example.com",
-            output_path="output.wav"
-        )
-        
-        # Verify the flow
-        mock_extractor_class.assert_called_once()
-        mock_extractor.extract_from_url.assert_called_once_with("https://example.com")
-        
-        mock_tts_engine_class.assert_called_once_with(quantize=None)
-        mock_engine.initialize.assert_called_once()
-        mock_engine.generate_audio.assert_called_once_with(
-            "Hello world from the URL",
-            voice="expresso/ex03-ex01_happy_001_channel1_334s.wav"
-        )
-        
-        # Verify audio was saved
-        mock_sf.write.assert_called_once()
-        call_args = mock_sf.write.call_args[0]
-        self.assertEqual(call_args[0], "output.wav")
-        np.testing.assert_array_equal(call_args[1], np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6]))
-        self.assertEqual(call_args[2], 24000)
-        
-        self.assertTrue(result)
-    
-    @patch('src.url_to_wav.URLExtractor')
-    def test_empty_url_content(self, mock_extractor_class):
-        """Test handling of empty URL content."""
-        mock_extractor = mock_extractor_class.return_value
-        mock_extractor.extract_from_url.return_value = ""
-        
-        result = url_to_wav.convert_url_to_wav(
-            url="https://example.com",
-            output_path="output.wav"
-        )
-        
-        self.assertFalse(result)
-    
-    @patch('src.url_to_wav.URLExtractor')
-    def test_url_extraction_error(self, mock_extractor_class):
-        """Test handling of URL extraction errors."""
-        mock_extractor = mock_extractor_class.return_value
-        mock_extractor.extract_from_url.side_effect = Exception("Network error")
-        
-        result = url_to_wav.convert_url_to_wav(
-            url="https://example.com",
-            output_path="output.wav"
-        )
-        
-        self.assertFalse(result)
-    
-    @patch('src.url_to_wav.sf')
-    @patch('src.url_to_wav.TTSEngine')
-    @patch('src.url_to_wav.URLExtractor')
-    def test_custom_voice_and_quantization(self, mock_extractor_class, mock_tts_engine_class, mock_sf):
-        """Test using custom voice and quantization settings."""
-        mock_extractor = mock_extractor_class.return_value
-        mock_extractor.extract_from_url.return_value = "Test content"
-        
-        mock_engine = mock_tts_engine_class.return_value
-        mock_engine.sample_rate = 24000
-        mock_engine.get_audio_frames.return_value = [np.array([0.1])]
-        
+@pytest.fixture(autouse=True)
+def mock_prefetch(monkeypatch):
+    """Stub the checkpoint prefetch.
+
+    The prefetch thread can outlive a test that fails early, so it must
+    never reach the mocked moshi_mlx download helpers.
+    """
+    mock = Mock()
+    monkeypatch.setattr(url_to_wav, '_prefetch_tts_checkpoints', mock)
+    return mock
+
+
+@pytest.fixture
+def mocks(monkeypatch, tmp_path):
+    """Replace the extractor, TTS engine, SoundFile and filename generator."""
+    monkeypatch.setattr(url_to_wav, '_warm_engine', None)
+    monkeypatch.setattr(url_to_wav.TTSConfig, 'AUDIO_CACHE_DIR', tmp_path / "audio")
+    extractor_class = MagicMock()
+    engine_class = MagicMock()
+    sf = MagicMock()
+    filename_gen_class = MagicMock()
+    monkeypatch.setattr('src.url_extractor.URLExtractor', extractor_class)
+    monkeypatch.setattr('src.tts_engine.TTSEngine', engine_class)
+    monkeypatch.setattr('soundfile.SoundFile', sf)
+    monkeypatch.setattr('src.url_to_wav.FilenameGenerator', filename_gen_class)
+
+    extractor = extractor_class.return_value
+    extractor.extract_from_url_with_metadata.return_value = {'text': "Test content", 'title': "", 'url': "https://example.com"}
+    engine = engine_class.return_value
+    engine.sample_rate = 24000
+    engine.iter_audio_frames.return_value = iter([np.array([0.1])])
+
+    return SimpleNamespace(
+        extractor_class=extractor_class,
+        extractor=extractor,
+        engine_class=engine_class,
+        engine=engine,
+        sf=sf,
+        filename_gen_class=filename_gen_class,
+        filename_gen=filename_gen_class.return_value,
+    )
+
+
+def test_audio_cache_evicts_least_recently_used(tmp_path):
+    """Test that the audio cache keeps its size bound, dropping the oldest use first."""
+    wav = tmp_path / "speech.wav"
+    wav.write_bytes(b"x" * 10)
+    cache = url_to_wav.AudioCache(tmp_path / "audio", max_bytes=20)
+    keys = [
+        url_to_wav.AudioCache.make_key(text, "voice.wav", 4, "float16", "repo", 24000)
+        for text in ("a", "b", "c")
+    ]
+
+    cache.set(keys[0], wav)
+    # Below the limit a store only updates the running total
+    with patch.object(Path, 'glob', side_effect=AssertionError("cache directory scanned")):
+        cache.set(keys[1], wav)
+    # Age the second entry so it is the least recently used
+    os.utime(cache.get(keys[1]), (0, 0))
+    cache.set(keys[2], wav)
+
+    assert cache.get(keys[0]) is not None
+    assert cache.get(keys[1]) is None
+    assert cache.get(keys[2]).read_bytes() == b"x" * 10
+    assert (tmp_path / "audio" / "size").read_text() == "20"
+
+
+@pytest.mark.parametrize("setting", [
+    dict(quantize=8), dict(dtype="bfloat16"), dict(hf_repo="other/repo"), dict(sample_rate=48000),
+])
+def test_audio_cache_key_covers_engine_settings(setting):
+    """Test that every setting that changes the audio changes the cache key."""
+    base = dict(text="Hello", voice="voice.wav", quantize=4, dtype="float16",
+                hf_repo="repo", sample_rate=24000)
+    make_key = url_to_wav.AudioCache.make_key
+    assert make_key(**{**base, **setting}) != make_key(**base)
+
+
+def test_audio_cache_key_without_tts_engine(monkeypatch):
+    """Test that keying audio needs neither tts_engine nor the MLX stack it imports."""
+    monkeypatch.setitem(sys.modules, 'src.tts_engine', None)
+    monkeypatch.setitem(sys.modules, 'tts_engine', None)
+    with patch('src.url_to_wav.default_model_dtype', return_value="float16"):
+        key = url_to_wav._audio_cache_key("Hello", "voice.wav", 4)
+
+    assert key == url_to_wav.AudioCache.make_key(
+        "Hello", "voice.wav", 4, "float16", "kyutai/tts-1.6b-en_fr", 24000
+    )
+
+
+def test_audio_cache_stores_and_reuses_output(mocks, tmp_path, monkeypatch):
+    """Test that a written WAV is stored and copied, not resynthesized, for the same text."""
+    # A real file on disk, so storing it in the cache succeeds
+    monkeypatch.setattr('soundfile.SoundFile', SoundFile)
+    mocks.engine.iter_audio_frames.return_value = iter([np.zeros(240, dtype=np.float32)])
+
+    first, second = tmp_path / "first.wav", tmp_path / "second.wav"
+    assert url_to_wav.convert_url_to_wav("https://example.com", str(first), cache_audio=True)
+    assert [path.name for path in (tmp_path / "audio").glob('*/*.wav')]
+    assert url_to_wav.convert_url_to_wav("https://example.com", str(second), cache_audio=True)
+
+    mocks.engine.generate_audio.assert_called_once()
+    assert second.read_bytes() == first.read_bytes()
+
+
+def _written_audio(mock_sf):
+    """Concatenate the frames written to the mocked SoundFile."""
+    wav = mock_sf.return_value.__enter__.return_value
+    return np.concatenate([c.args[0] for c in wav.write.call_args_list])
+
+
+def test_basic_url_to_wav_conversion(mocks):
+    """Test basic URL to WAV conversion flow."""
+    mocks.extractor.extract_from_url_with_metadata.return_value = {'text': "Hello world from the URL", 'title': "", 'url': "https://example.com"}
+    mocks.engine.iter_audio_frames.return_value = iter([np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6])])
+
+    # Call the function
+    result = url_to_wav.convert_url_to_wav(
+        url="https://example.com",
+        output_path="output.wav"
+    )
+
+    # Verify the flow
+    mocks.extractor_class.assert_called_once()
+    mocks.extractor.extract_from_url_with_metadata.assert_called_once_with("https://example.com", skip_title=True)
+    mocks.extractor.close.assert_called_once()
+
+    mocks.engine_class.assert_called_once_with(quantize=4)
+    mocks.engine.initialize.assert_called_once()
+    mocks.engine.generate_audio.assert_called_once_with(
+        "Hello world from the URL",
+        voice="expresso/ex03-ex01_happy_001_channel1_334s.wav"
+    )
+
+    # Verify audio was streamed to the file
+    mocks.sf.assert_called_once_with(
+        "output.wav", mode='w', samplerate=24000, channels=1, format='WAV', subtype='PCM_16'
+    )
+    np.testing.assert_array_equal(
+        _written_audio(mocks.sf), np.array([0.1, 0.2, 0.3, 0.4, 0.5, 0.6])
+    )
+
+    assert result
+
+
+def test_checkpoints_prefetched_before_initialize(mocks, mock_prefetch):
+    """Test that model files are fetched alongside extraction, before the engine loads."""
+    mocks.engine.initialize.side_effect = lambda: mock_prefetch.assert_called_once()
+
+    result = url_to_wav.convert_url_to_wav(url="https://example.com", output_path="output.wav")
+
+    assert result
+    mocks.engine.initialize.assert_called_once()
+
+
+@pytest.mark.parametrize("warm, cache_audio", [(True, False), (False, True)])
+def test_checkpoints_not_prefetched_without_model_load(mocks, mock_prefetch, warm, cache_audio, tmp_path):
+    """Test that no prefetch runs for a warm engine or when the audio cache may hit."""
+    if warm:
+        url_to_wav._warm_engine = (4, mocks.engine)
+    with patch('src.url_to_wav.TTSConfig.AUDIO_CACHE_DIR', tmp_path):
         result = url_to_wav.convert_url_to_wav(
-            url="https://example.com",
-            output_path="output.wav",
-            voice="custom_voice.wav",
-            quantize=8
-        )
-        
-        mock_tts_engine_class.assert_called_once_with(quantize=8)
-        mock_engine.generate_audio.assert_called_once_with(
-            "Test content",
-            voice="custom_voice.wav"
-        )
-        self.assertTrue(result)
-    
-    @patch('sys.argv', ['url_to_wav.py', 'https://example.com', '-o', 'output.wav'])
-    @patch('src.url_to_wav.convert_url_to_wav')
-    def test_cli_basic_usage(self, mock_convert):
-        """Test command line interface basic usage."""
-        mock_convert.return_value = True
-        
-        # Should not raise
-        url_to_wav.main()
-        
-        mock_convert.assert_called_once_with(
-            url='https://example.com',
-            output_path='output.wav',
-            voice=url_to_wav.TTSConfig.DEFAULT_VOICE,
-            quantize=None,
-            verbose=False
+            url="https://example.com", output_path="output.wav", cache_audio=cache_audio
         )
-    
-    @patch('sys.argv', ['url_to_wav.py', 'https://example.com', '-o', 'output.wav', '-v', 'custom.wav', '-q', '8', '--verbose'])
-    @patch('src.url_to_wav.convert_url_to_wav')
-    def test_cli_with_options(self, mock_convert):
-        """Test command line interface with all options."""
-        mock_convert.return_value = True
-        
-        url_to_wav.main()
-        
-        mock_convert.assert_called_once_with(
-            url='https://example.com',
-            output_path='output.wav',
-            voice='custom.wav',
-            quantize=8,
-            verbose=True
-        )
-    
-    @patch('sys.argv', ['url_to_wav.py', 'https://example.com', '-o', 'output.wav'])
-    @patch('src.url_to_wav.convert_url_to_wav')
-    def test_cli_error_handling(self, mock_convert):
-        """Test CLI error handling."""
-        mock_convert.return_value = False
-        
-        with self.assertRaises(SystemExit) as cm:
+
+    assert result
+    mock_prefetch.assert_not_called()
+
+
+@patch('src.tts_engine.fetch_checkpoints')
+def test_prefetch_tts_checkpoints(mock_fetch):
+    """Test that the prefetch fetches the checkpoints and swallows failures."""
+    logger = Mock()
+    _prefetch_tts_checkpoints(logger)
+    mock_fetch.assert_called_once_with()
+
+    mock_fetch.side_effect = OSError("offline")
+    _prefetch_tts_checkpoints(logger)
+    logger.debug.assert_called_once()
+
+
+def test_empty_url_content(mocks):
+    """Test handling of empty URL content."""
+    mocks.extractor.extract_from_url_with_metadata.return_value = {'text': "", 'title': "", 'url': "https://example.com"}
+
+    result = url_to_wav.convert_url_to_wav(
+        url="https://example.com",
+        output_path="output.wav"
+    )
+
+    assert not result
+
+
+def test_url_extraction_error(mocks):
+    """Test handling of URL extraction errors."""
+    mocks.extractor.extract_from_url_with_metadata.side_effect = Exception("Network error")
+
+    result = url_to_wav.convert_url_to_wav(
+        url="https://example.com",
+        output_path="output.wav"
+    )
+
+    assert not result
+    # The HTTP client and response cache are released on failure too
+    mocks.extractor.close.assert_called_once()
+
+
+@pytest.mark.parametrize("url", ["example.com/article", "ftp://example.com/article", "https:///article"])
+@patch('src.url_to_wav.threading.Thread')
+def test_invalid_url_rejected_early(mock_thread_class, mocks, url):
+    """Test that a malformed or non-HTTP URL fails before fetching or prefetching anything."""
+    result = url_to_wav.convert_url_to_wav(url=url, output_path="output.wav")
+
+    assert not result
+    mocks.extractor_class.assert_not_called()
+    mock_thread_class.assert_not_called()
+
+
+def test_engine_reused_across_conversions(mocks):
+    """Test that a second conversion reuses the loaded engine after resetting it."""
+    for text in ("First article", "Second article"):
+        mocks.extractor.extract_from_url_with_metadata.return_value = {'text': text, 'title': "", 'url': "https://example.com"}
+        mocks.engine.iter_audio_frames.return_value = iter([np.array([0.1])])
+        assert url_to_wav.convert_url_to_wav("https://example.com", "output.wav")
+
+    mocks.engine_class.assert_called_once_with(quantize=4)
+    mocks.engine.initialize.assert_called_once()
+    mocks.engine.reset.assert_called_once()
+    assert mocks.engine.generate_audio.call_count == 2
+
+    # Once released, the next conversion loads the model again
+    url_to_wav.release_engine()
+    mocks.engine.iter_audio_frames.return_value = iter([np.array([0.1])])
+    assert url_to_wav.convert_url_to_wav("https://example.com", "output.wav")
+    assert mocks.engine.initialize.call_count == 2
+
+    # A different quantization loads a new model
+    mocks.engine.iter_audio_frames.return_value = iter([np.array([0.1])])
+    assert url_to_wav.convert_url_to_wav("https://example.com", "output.wav", quantize=8)
+    assert mocks.engine_class.call_args_list[-1].kwargs == {'quantize': 8}
+
+
+def test_custom_voice_and_quantization(mocks):
+    """Test using custom voice and quantization settings."""
+    result = url_to_wav.convert_url_to_wav(
+        url="https://example.com",
+        output_path="output.wav",
+        voice="custom_voice.wav",
+        quantize=8
+    )
+
+    mocks.engine_class.assert_called_once_with(quantize=8)
+    mocks.engine.generate_audio.assert_called_once_with(
+        "Test content",
+        voice="custom_voice.wav"
+    )
+    assert result
+
+
+_CLI_DEFAULTS = dict(
+    url='https://example.com',
+    output_path=None,
+    voice=url_to_wav.TTSConfig.DEFAULT_VOICE,
+    quantize=4,
+    verbose=False,
+    ai_filename=False,
+    cache=True,
+    cache_audio=False
+)
+
+
+@pytest.mark.parametrize("args, expected, success", [
+    pytest.param(['https://example.com', '-o', 'output.wav'],
+                 dict(output_path='output.wav'), True, id="basic-usage"),
+    pytest.param(['https://example.com', '-o', 'output.wav', '-v', 'custom.wav', '-q', '8', '--verbose'],
+                 dict(output_path='output.wav', voice='custom.wav', quantize=8, verbose=True),
+                 True, id="with-options"),
+    pytest.param(['https://example.com', '--no-quantize'],
+                 dict(quantize=None), True, id="no-quantize"),
+    pytest.param(['https://example.com'], dict(), True, id="auto-naming"),
+    pytest.param(['https://example.com', '-o', 'custom.wav'],
+                 dict(output_path='custom.wav'), True, id="custom-output"),
+    pytest.param(['https://example.com', '--no-cache'],
+                 dict(cache=False), True, id="no-cache"),
+    pytest.param(['https://example.com', '--cache-audio'],
+                 dict(cache_audio=True), True, id="cache-audio"),
+    # A failed conversion exits with status 1
+    pytest.param(['https://example.com', '-o', 'output.wav'],
+                 dict(output_path='output.wav'), False, id="error-handling"),
+])
+def test_cli(monkeypatch, args, expected, success):
+    """Test that CLI arguments are passed through to convert_url_to_wav."""
+    monkeypatch.setattr(sys, 'argv', ['url_to_wav.py', *args])
+
+    with patch('src.url_to_wav.convert_url_to_wav', return_value=success) as mock_convert, \
+            patch('src.url_to_wav.release_engine') as mock_release:
+        if success:
             url_to_wav.main()
-        
-        self.assertEqual(cm.exception.code, 1)
-    
-    @patch('src.url_to_wav.sf')
-    @patch('src.url_to_wav.TTSEngine')
-    @patch('src.url_to_wav.URLExtractor')
-    def test_no_audio_frames_generated(self, mock_extractor_class, mock_tts_engine_class, mock_sf):
-        """Test handling when no audio frames are generated."""
-        mock_extractor = mock_extractor_class.return_value
-        mock_extractor.extract_from_url.return_value = "Test content"
-        
-        mock_engine = mock_tts_engine_class.return_value
-        mock_engine.sample_rate = 24000
-        mock_engine.get_audio_frames.return_value = []  # No frames
-        
-        result = url_to_wav.convert_url_to_wav(
-            url="https://example.com",
-            output_path="output.wav"
-        )
-        
-        # Should not call sf.write when no frames
-        mock_sf.write.assert_not_called()
-        self.assertFalse(result)
-    
-    @patch('src.url_to_wav.FilenameGenerator')
-    @patch('src.url_to_wav.sf')
-    @patch('src.url_to_wav.TTSEngine')
-    @patch('src.url_to_wav.URLExtractor')
-    def test_auto_filename_generation(self, mock_extractor_class, mock_tts_engine_class, mock_sf, mock_filename_gen_class):
-        """Test automatic filename generation when no output path is provided."""
-        # Setup mocks
-        mock_extractor = mock_extractor_class.return_value
-        mock_extractor.extract_from_url_with_metadata.return_value = {
-            'text': "Test content",
-            'title': "Test Article",
-            'url': "https://example.com/article"
-        }
-        
-        mock_engine = mock_tts_engine_class.return_value
-        mock_engine.sample_rate = 24000
-        mock_engine.get_audio_frames.return_value = [np.array([0.1, 0.2])]
-        
-        mock_filename_gen = mock_filename_gen_class.return_value
-        mock_filename_gen.generate_from_content.return_value = "test_article_20240115_143052.wav"
-        
-        # Call function with no output path
-        result = url_to_wav.convert_url_to_wav(
-            url="https://example.com/article",
-            output_path=None
-        )
-        
-        # Verify filename generation was called
-        mock_filename_gen_class.assert_called_once()
-        mock_filename_gen.generate_from_content.assert_called_once_with(
-            "Test content",
-            title="Test Article",
-            url="https://example.com/article"
-        )
-        
-        # Verify file was saved with generated name
-        mock_sf.write.assert_called_once()
-        call_args = mock_sf.write.call_args[0]
-        self.assertEqual(call_args[0], "test_article_20240115_143052.wav")
-        np.testing.assert_array_equal(call_args[1], np.array([0.1, 0.2]))
-        self.assertEqual(call_args[2], 24000)
-        
-        self.assertTrue(result)
-    
-    @patch('sys.argv', ['url_to_wav.py', 'https://example.com'])
-    @patch('src.url_to_wav.convert_url_to_wav')
-    def test_cli_auto_naming(self, mock_convert):
-        """Test CLI with automatic naming (no output specified)."""
-        mock_convert.return_value = True
-        
-        url_to_wav.main()
-        
-        mock_convert.assert_called_once_with(
-            url='https://example.com',
-            output_path=None,
-            voice=url_to_wav.TTSConfig.DEFAULT_VOICE,
-            quantize=None,
-            verbose=False
-        )
-    
-    @patch('sys.argv', ['url_to_wav.py', 'https://example.com', '-o', 'custom.wav'])
-    @patch('src.url_to_wav.convert_url_to_wav')
-    def test_cli_custom_output(self, mock_convert):
-        """Test CLI with custom output path using -o flag."""
-        mock_convert.return_value = True
-        
-        url_to_wav.main()
-        
-        mock_convert.assert_called_once_with(
-            url='https://example.com',
-            output_path='custom.wav',
-            voice=url_to_wav.TTSConfig.DEFAULT_VOICE,
-            quantize=None,
-            verbose=False
-        )
+        else:
+            with pytest.raises(SystemExit) as exc_info:
+                url_to_wav.main()
+            assert exc_info.value.code == 1
+
+    mock_convert.assert_called_once_with(**{**_CLI_DEFAULTS, **expected})
+    mock_release.assert_called_once()
+
+
+def test_no_audio_frames_generated(mocks):
+    """Test handling when no audio frames are generated."""
+    mocks.engine.iter_audio_frames.return_value = iter([])  # No frames
+
+    result = url_to_wav.convert_url_to_wav(
+        url="https://example.com",
+        output_path="output.wav"
+    )
+
+    # Should not create the file when no frames
+    mocks.sf.assert_not_called()
+    assert not result
+
+
+def test_auto_filename_generation(mocks):
+    """Test automatic filename generation when no output path is provided."""
+    mocks.extractor.extract_from_url_with_metadata.return_value = {
+        'text': "Test content",
+        'title': "Test Article",
+        'url': "https://example.com/article"
+    }
+    mocks.engine.iter_audio_frames.return_value = iter([np.array([0.1, 0.2])])
+    mocks.filename_gen.generate_from_keywords.return_value = "test_article_20240115_143052.wav"
+
+    # Call function with no output path
+    result = url_to_wav.convert_url_to_wav(
+        url="https://example.com/article",
+        output_path=None
+    )
+
+    # The title is needed for the filename, so it must not be skipped
+    mocks.extractor.extract_from_url_with_metadata.assert_called_once_with(
+        "https://example.com/article", skip_title=False
+    )
+
+    # Verify keyword-based filename generation was called, not Ollama
+    mocks.filename_gen_class.assert_called_once()
+    mocks.filename_gen.generate_from_content.assert_not_called()
+    mocks.filename_gen.generate_from_keywords.assert_called_once_with(
+        "Test content",
+        title="Test Article",
+        url="https://example.com/article"
+    )
+
+    # Verify file was saved with generated name
+    assert mocks.sf.call_args[0][0] == "test_article_20240115_143052.wav"
+    np.testing.assert_array_equal(_written_audio(mocks.sf), np.array([0.1, 0.2]))
 
+    assert result
 
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+
+def test_ai_filename_generation(mocks):
+    """Test that ai_filename names the file with Ollama."""
+    mocks.extractor.extract_from_url_with_metadata.return_value = {'text': "Test content", 'title': "", 'url': ""}
+    mocks.filename_gen.generate_from_content.return_value = "ai_name.wav"
+
+    result = url_to_wav.convert_url_to_wav(url="https://example.com", ai_filename=True)
+
+    assert result
+    mocks.filename_gen.generate_from_keywords.assert_not_called()
+    mocks.filename_gen.generate_from_content.assert_called_once_with(
+        "Test content", title=None, url="https://example.com"
+    )
+    mocks.filename_gen.close.assert_called_once()
+    assert mocks.sf.call_args[0][0] == "ai_name.wav"
+
+
+def test_run_batch(mocks):
+    """Test that batch mode loads the engine once for every line."""
+    mocks.extractor.extract_from_url_with_metadata.side_effect = [
+        {'text': "First article", 'title': "", 'url': "https://example.com/a"},
+        {'text': "Second article", 'title': "", 'url': "https://example.com/b"},
+    ]
+    mocks.engine.sample_rate = 4
+    mocks.engine.iter_audio_frames.side_effect = lambda: iter([np.zeros(8)])
+
+    output = StringIO()
+    result = url_to_wav.run_batch(
+        ["https://example.com/a\ta.wav\n", "\n", "https://example.com/b\tb.wav\n"],
+        output=output
+    )
+
+    assert result
+    mocks.engine_class.assert_called_once_with(quantize=4)
+    mocks.engine.initialize.assert_called_once()
+    mocks.engine.reset.assert_called_once()
+    mocks.extractor.close.assert_called_once()
+    # The engine is not kept once the batch is done
+    assert url_to_wav._warm_engine is None
+    assert mocks.engine.generate_audio.call_count == 2
+    assert output.getvalue() == "OK\ta.wav\t2.00\nOK\tb.wav\t2.00\n"
+
+
+def test_run_batch_extracts_next_article_during_synthesis(mocks):
+    """Test that the next line is fetched while the current one is being spoken."""
+    second_extracted = threading.Event()
+
+    def extract(url, **kwargs):
+        if url.endswith('/b'):
+            second_extracted.set()
+        return {'text': f"Article {url}", 'title': "", 'url': url}
+
+    mocks.extractor.extract_from_url_with_metadata.side_effect = extract
+    mocks.engine.sample_rate = 4
+    mocks.engine.iter_audio_frames.side_effect = lambda: iter([np.zeros(4)])
+    # Record whether the second article arrived while the first was being spoken
+    extracted_during_synthesis = []
+    mocks.engine.generate_audio.side_effect = lambda *args, **kwargs: (
+        extracted_during_synthesis.append(second_extracted.wait(timeout=5))
+    )
+
+    output = StringIO()
+    result = url_to_wav.run_batch(
+        ["https://example.com/a\ta.wav", "https://example.com/b\tb.wav"], output=output
+    )
+
+    assert result
+    assert extracted_during_synthesis == [True, True]
+    assert output.getvalue() == "OK\ta.wav\t1.00\nOK\tb.wav\t1.00\n"
+
+
+def test_run_batch_shares_filename_generator(mocks):
+    """Test that batch mode names every file with one generator and closes it."""
+    mocks.extractor.extract_from_url_with_metadata.return_value = {'text': "Article", 'title': "", 'url': ""}
+    mocks.engine.sample_rate = 4
+    mocks.engine.iter_audio_frames.side_effect = lambda: iter([np.zeros(4)])
+    mocks.filename_gen.generate_from_keywords.side_effect = ["a.wav", "b.wav"]
+
+    output = StringIO()
+    url_to_wav.run_batch(["https://example.com/a", "https://example.com/b"], output=output)
+
+    mocks.filename_gen_class.assert_called_once()
+    assert mocks.filename_gen.generate_from_keywords.call_count == 2
+    mocks.filename_gen.close.assert_called_once()
+    assert output.getvalue() == "OK\ta.wav\t1.00\nOK\tb.wav\t1.00\n"
+
+
+def test_run_batch_reports_errors(mocks):
+    """Test that failed lines are reported and do not stop the batch."""
+    mocks.extractor.extract_from_url_with_metadata.side_effect = Exception("Network error")
+
+    output = StringIO()
+    result = url_to_wav.run_batch(["https://example.com/a\ta.wav", "https://example.com/b"], output=output)
+
+    assert not result
+    mocks.engine_class.assert_not_called()
+    lines = output.getvalue().splitlines()
+    assert lines[0] == "ERR\ta.wav\tFailed to extract text: Network error"
+    assert lines[1].startswith("ERR\thttps://example.com/b\t")
+
+
+def test_run_batch_reports_invalid_url(mocks):
+    """Test that a malformed batch line is reported without being fetched."""
+    output = StringIO()
+    result = url_to_wav.run_batch(["not a url\ta.wav"], output=output)
+
+    assert not result
+    mocks.extractor.extract_from_url_with_metadata.assert_not_called()
+    assert output.getvalue() == "ERR\ta.wav\tInvalid URL: not a url\n"
+
+
+@patch('sys.argv', ['url_to_wav.py', '--batch', '-q', '8'])
+@patch('src.url_to_wav.run_batch')
+def test_cli_batch(mock_run_batch):
+    """Test that --batch reads from stdin instead of taking a URL."""
+    mock_run_batch.return_value = True
+
+    url_to_wav.main()
+
+    mock_run_batch.assert_called_once_with(
+        sys.stdin,
+        voice=url_to_wav.TTSConfig.DEFAULT_VOICE,
+        quantize=8,
+        verbose=False,
+        ai_filename=False,
+        cache=True,
+        cache_audio=False
+    )
+
+
+@patch('sys.argv', ['url_to_wav.py', '--batch', 'https://example.com'])
+def test_cli_batch_rejects_url():
+    """Test that a URL argument cannot be combined with --batch."""
+    with pytest.raises(SystemExit) as exc_info:
+        url_to_wav.main()
+    assert exc_info.value.code == 2
@@ -5,43 +5,63 @@ Integration tests for URL to WAV conversion functionality.
 import os
 import tempfile
 import unittest
-from unittest.mock import patch, Mock
+from pathlib import Path
+from unittest.mock import patch
+import httpx
 import numpy as np
+import soundfile as sf
 from src import url_to_wav
 
+_SAMPLE_HTML = """
+<html>
+<head><title>Test Page</title></head>
+<body>
+    <h1>Welcome to Test Page</h1>
+    <p>This is a paragraph of text that should be extracted.</p>
+    <p>This is another paragraph with <strong>bold text</strong>.</p>
+    <img src="test.jpg" alt="Test image description">
+    <script>console.log('this should be ignored');</script>
+    <style>body { color: red; }</style>
+</body>
+</html>
+"""
+
+
+def _respond_with(html):
+    """Answer every HTTP request with a 200 response carrying html."""
+    return lambda request: httpx.Response(200, text=html)
+
 
 class TestURLToWavIntegration(unittest.TestCase):
     """Integration tests that test the full pipeline with minimal mocking."""
     
-    @patch('src.url_to_wav.TTSEngine')
-    @patch('requests.Session.get')
-    def test_integration_full_pipeline(self, mock_get, mock_tts_engine_class):
+    def setUp(self):
+        # Keep the background checkpoint prefetch away from the mocked model stack
+        patcher = patch('src.url_to_wav._prefetch_tts_checkpoints')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        
+        # Cache fetched pages and synthesized audio in a throwaway directory
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        for patcher in (
+            patch.object(url_to_wav, '_warm_engine', None),
+            patch.object(url_to_wav.TTSConfig, 'AUDIO_CACHE_DIR', Path(cache_dir.name) / "audio"),
+            patch.object(url_to_wav.URLExtractorConfig, 'RESPONSE_CACHE_PATH', Path(cache_dir.name) / "responses.sqlite"),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+    
+    @patch('src.tts_engine.TTSEngine')
+    @patch('httpx.HTTPTransport.handle_request')
+    def test_integration_full_pipeline(self, mock_send, mock_tts_engine_class):
         """Test the full pipeline from URL to WAV file."""
-        # Mock the HTTP response
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.text = """
-        <html>
-        <head><title>Test Page</title></head>
-        <body>
-            <h1>Welcome to Test Page</h1>
-            <p>This is a paragraph of text that should be extracted.</p>
-            <p>This is another paragraph with <strong>bold text</strong>.</p>
-            <img src="test.jpg" alt="Test image description">
-            <script>console.log('this should be ignored');</script>
-            <style>body { color: red; }</style>
-        </body>
-        </html>
-        """
-        mock_response.raise_for_status = Mock()
-        mock_get.return_value = mock_response
+        mock_send.side_effect = _respond_with(_SAMPLE_HTML)
         
         # Mock TTS engine
         mock_engine = mock_tts_engine_class.return_value
         mock_engine.sample_rate = 24000
-        mock_engine.get_audio_frames.return_value = [
-            np.random.rand(24000).astype(np.float32)  # 1 second of audio
-        ]
+        mock_engine.iter_audio_frames.return_value = iter([np.random.default_rng(0).random(24000, dtype=np.float32)])  # 1 second of audio
         
         # Test with temporary file
         with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as tmp_file:
@@ -56,6 +76,11 @@ class TestURLToWavIntegration(unittest.TestCase):
             
             self.assertTrue(result)
             self.assertTrue(os.path.exists(output_path))
+            info = sf.info(output_path)
+            self.assertEqual(info.frames, 24000)
+            self.assertEqual(info.samplerate, 24000)
+            # 16-bit PCM: a 44-byte header plus two bytes per sample
+            self.assertEqual(os.path.getsize(output_path), 44 + 2 * 24000)
             
             # Verify text extraction
             mock_engine.generate_audio.assert_called_once()
@@ -76,15 +101,53 @@ class TestURLToWavIntegration(unittest.TestCase):
             if os.path.exists(output_path):
                 os.unlink(output_path)
     
-    @patch('src.url_to_wav.TTSEngine')
-    @patch('requests.Session.get')
-    def test_integration_empty_html(self, mock_get, mock_tts_engine_class):
+    @patch('src.tts_engine.TTSEngine')
+    @patch('httpx.HTTPTransport.handle_request')
+    def test_cached_audio_skips_tts(self, mock_send, mock_tts_engine_class):
+        """Test that converting the same text twice synthesizes it once."""
+        mock_send.side_effect = _respond_with("<html><body><p>Cache me.</p></body></html>")
+        mock_engine = mock_tts_engine_class.return_value
+        mock_engine.sample_rate = 24000
+        mock_engine.iter_audio_frames.return_value = iter([np.full(2400, 0.25, dtype=np.float32)])
+        
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            first = os.path.join(tmp_dir, "first.wav")
+            second = os.path.join(tmp_dir, "second.wav")
+            
+            self.assertTrue(url_to_wav.convert_url_to_wav("https://example.com/a", first, cache_audio=True))
+            self.assertTrue(url_to_wav.convert_url_to_wav("https://example.com/b", second, cache_audio=True))
+            
+            self.assertEqual(mock_tts_engine_class.call_count, 1)
+            mock_engine.generate_audio.assert_called_once()
+            np.testing.assert_array_equal(sf.read(second)[0], sf.read(first)[0])
+            
+            # Without the audio cache (the default) the text is synthesized again,
+            # on the engine loaded by the first one
+            mock_engine.iter_audio_frames.return_value = iter([np.zeros(2400, dtype=np.float32)])
+            self.assertTrue(url_to_wav.convert_url_to_wav("https://example.com/b", second))
+            self.assertEqual(mock_engine.generate_audio.call_count, 2)
+            self.assertEqual(mock_tts_engine_class.call_count, 1)
+    
+    def test_write_wav_without_extension(self):
+        """Test that the WAV format does not depend on the output file name."""
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            output_path = os.path.join(tmp_dir, "speech")
+            frames = [np.full(100, 0.5, dtype=np.float32), np.zeros(50, dtype=np.float32)]
+            
+            n_samples = url_to_wav._write_wav(output_path, frames, 24000)
+            
+            info = sf.info(output_path)
+            self.assertEqual(n_samples, 150)
+            self.assertEqual(info.format, 'WAV')
+            self.assertEqual(info.subtype, 'PCM_16')
+            self.assertEqual(info.frames, 150)
+    
+    @patch('src.url_to_wav._import_tts_engine')
+    @patch('src.tts_engine.TTSEngine')
+    @patch('httpx.HTTPTransport.handle_request')
+    def test_integration_empty_html(self, mock_send, mock_tts_engine_class, mock_import_engine):
         """Test handling of empty or minimal HTML."""
-        mock_response = Mock()
-        mock_response.status_code = 200
-        mock_response.text = "<html><body></body></html>"
-        mock_response.raise_for_status = Mock()
-        mock_get.return_value = mock_response
+        mock_send.side_effect = _respond_with("<html><body></body></html>")
         
         result = url_to_wav.convert_url_to_wav(
             url="https://example.com/empty",
@@ -94,11 +157,12 @@ class TestURLToWavIntegration(unittest.TestCase):
         self.assertFalse(result)
         # TTS engine should not be initialized for empty content
         mock_tts_engine_class.assert_not_called()
+        mock_import_engine.assert_not_called()
     
-    @patch('requests.Session.get')
-    def test_integration_network_error(self, mock_get):
+    @patch('httpx.HTTPTransport.handle_request')
+    def test_integration_network_error(self, mock_send):
         """Test handling of network errors."""
-        mock_get.side_effect = Exception("Network error")
+        mock_send.side_effect = httpx.ConnectError("Network error")
         
         result = url_to_wav.convert_url_to_wav(
             url="https://example.com/error",
@@ -113,13 +177,18 @@ class TestURLToWavIntegration(unittest.TestCase):
             with self.assertRaises(SystemExit):
                 url_to_wav.main()
     
-    def test_cli_help(self):
+    @patch('src.url_to_wav._import_url_extractor')
+    @patch('src.url_to_wav._import_tts_engine')
+    def test_cli_help(self, mock_import_engine, mock_import_extractor):
         """Test CLI help message."""
         with patch('sys.argv', ['url_to_wav.py', '--help']):
             with self.assertRaises(SystemExit) as cm:
                 url_to_wav.main()
             # Help should exit with code 0
             self.assertEqual(cm.exception.code, 0)
+        # --help must not pay for importing MLX, the model code or httpx/lxml
+        mock_import_engine.assert_not_called()
+        mock_import_extractor.assert_not_called()
 
 
 if __name__ == '__main__':